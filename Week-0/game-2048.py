@@ -4,7 +4,9 @@ Clone of 2048 game.
 
 # import poc_2048_gui
 # import poc_simpletest as st
+import array
 import random
+import time
 
 # Directions, DO NOT MODIFY
 UP = 1
@@ -19,40 +21,76 @@ OFFSETS = {UP: (1, 0),
            LEFT: (0, 1),
            RIGHT: (0, -1)}
 
+# Chance of a new tile being a 4 rather than a 2
+PROB_FOUR = 0.1
+
 
 def merge(line):
     """
     Helper function that merges a single row or column in 2048
     """
-    # 1. Start with a result list that contains the same number of 0's as the length of the line argument.
-    result = [0] * len(line)
-    last_merged = False
+    return merge_with_score(line)[0]
+
+
+def merge_with_score(line):
+    """
+    merge a single row or column in one pass
+    :param line: list of tile values
+    :return: tuple of (merged line, score gained, whether the line changed)
+    """
+    if len(line) == 0:
+        return [], 0, False
+    result, score, changed = merge_lines(line, len(line))
+    return result, score, changed[0]
+
+
+def merge_lines(source, line_length, out=None):
+    """
+    merge many lines of the same length in one call. the lines are stored back to back in one flat list
+    and each one is merged in a single pass, with at most one merge per tile
+    :param source: flat list of tile values, len(source) // line_length lines
+    :param line_length: length of each line
+    :param out: list as long as source to write the merged lines into, allocated if None
+    :return: tuple of (out, total score gained, list of per line changed flags)
+    """
+    if out is None:
+        out = [0] * len(source)
+    score = 0
+    changed = []
 
-    # 2. Iterate over the line input looking for non-zero entries. For each non-zero entry, put the value into the
-    # next available entry of the result list (starting at position 0).
-    if len(line) < 2:
-        return line
-
-    for entry_index in range(0, len(line)):
-        if line[entry_index] != 0:
-            # find the start point first
-            for re_index in range(0, len(result)):
-                # if it is 0 then can copy safely
-                if result[re_index] == 0:
-                    result[re_index] = line[entry_index]
-                    last_merged = False
-                    break
-                # if current is not 0 but the next one is, then need to consider merge
-                elif result[re_index + 1] == 0:
-                    # current is the same with incoming one, merge
-                    if result[re_index] == line[entry_index] and last_merged is False:
-                        result[re_index] = result[re_index] + line[entry_index]
-                        last_merged = True
-                        break
-                        # else advance to next iter
-                        # if current is not 0 and the next one is not 0, advance to next iter
-
-    return result
+    for start in range(0, len(source), line_length):
+        end = start + line_length
+        out_index = start
+        line_changed = False
+        # the last tile seen that can still take a merge, 0 if none
+        pending = 0
+        pending_index = start
+        for entry_index in range(start, end):
+            value = source[entry_index]
+            if value == 0:
+                continue
+            if value == pending:
+                out[out_index] = value + value
+                score += value + value
+                out_index += 1
+                line_changed = True
+                pending = 0
+            else:
+                if pending != 0:
+                    out[out_index] = pending
+                    line_changed = line_changed or out_index != pending_index
+                    out_index += 1
+                pending = value
+                pending_index = entry_index
+        if pending != 0:
+            out[out_index] = pending
+            line_changed = line_changed or out_index != pending_index
+            out_index += 1
+        for entry_index in range(out_index, end):
+            out[entry_index] = 0
+        changed.append(line_changed)
+
+    return out, score, changed
 
 
 # line = [2, 0, 2, 2]
@@ -139,7 +177,7 @@ def generate_value():
     prob = random.random()
 
     # 10% chance p < 0.1, that's when we return 2
-    if prob < 0.1:
+    if prob < PROB_FOUR:
         return 4
     # otherwise return 2
     else:
@@ -191,29 +229,123 @@ class TwentyFortyEight:
         self.height = grid_height
         self.width = grid_width
         self.cells = {}
+        # avi_cells holds exactly the empty cells, avi_index maps each of them to its position
+        # in avi_cells so it can be removed in O(1)
         self.avi_cells = []
+        self.avi_index = {}
+        # number of adjacent pairs of equal non-zero tiles
+        self.equal_pairs = 0
         self.ini_tiles = get_initial_tiles(self.width, self.height)
+        self.move_cells = self.get_move_cells()
+        # reused by every move so merge_lines() does not allocate
+        self.merge_buffer = [0] * (self.height * self.width)
+        # (row, col, value) of the most recent new_tile(), None before the first one
+        self.last_tile = None
+        self.score = 0
         self.ini_cells()
 
+    def get_move_cells(self):
+        """
+        For each direction, list every cell line by line in the order merge() expects.
+        """
+        move_cells = {}
+        for direction in self.ini_tiles:
+            cells = []
+            for target_row, target_col in self.ini_tiles[direction]:
+                while 0 <= target_row < self.height and 0 <= target_col < self.width:
+                    cells.append((target_row, target_col))
+                    target_row += OFFSETS[direction][0]
+                    target_col += OFFSETS[direction][1]
+            move_cells[direction] = cells
+        return move_cells
+
     def reset(self):
         """
         Reset the game so the grid is empty.
         """
-        self.avi_cells = []
         for row in range(self.height):
             for col in range(self.width):
                 self.cells[(row, col)] = 0
-                self.avi_cells.append((row, col))
+        self.score = 0
+        self.index_cells()
 
     def ini_cells(self):
         """
         Reset the game so the grid is empty.
         """
-        self.avi_cells = []
         for row in range(self.height):
             for col in range(self.width):
                 self.cells[(row, col)] = self.cells.get((row, col), 0)
-                self.avi_cells.append((row, col))
+        self.index_cells()
+
+    def index_cells(self):
+        """
+        Rebuild the empty cell index and the equal pair count from scratch.
+        """
+        self.avi_cells = []
+        self.avi_index = {}
+        self.equal_pairs = 0
+        for row in range(self.height):
+            for col in range(self.width):
+                value = self.cells[(row, col)]
+                if value == 0:
+                    self.avi_index[(row, col)] = len(self.avi_cells)
+                    self.avi_cells.append((row, col))
+                else:
+                    # only look right and down so every pair is counted once
+                    if self.cells.get((row, col + 1)) == value:
+                        self.equal_pairs += 1
+                    if self.cells.get((row + 1, col)) == value:
+                        self.equal_pairs += 1
+
+    def count_equal_neighbours(self, cell, value):
+        """
+        Count the neighbours of cell holding the same non-zero value.
+        """
+        if value == 0:
+            return 0
+        count = 0
+        for offset in OFFSETS.values():
+            if self.cells.get((cell[0] + offset[0], cell[1] + offset[1])) == value:
+                count += 1
+        return count
+
+    def update_cell(self, cell, value):
+        """
+        Set a cell to value and keep avi_cells, avi_index and equal_pairs up to date.
+        """
+        old_value = self.cells[cell]
+        if old_value == value:
+            return
+        self.equal_pairs -= self.count_equal_neighbours(cell, old_value)
+        self.cells[cell] = value
+        self.equal_pairs += self.count_equal_neighbours(cell, value)
+
+        if old_value == 0:
+            # swap the last empty cell into the slot of the one being filled
+            pos = self.avi_index.pop(cell)
+            last = self.avi_cells.pop()
+            if last != cell:
+                self.avi_cells[pos] = last
+                self.avi_index[last] = pos
+        elif value == 0:
+            self.avi_index[cell] = len(self.avi_cells)
+            self.avi_cells.append(cell)
+
+    def is_full(self):
+        """
+        Return True if there is no empty cell left.
+        """
+        return len(self.avi_cells) == 0
+
+    def can_move(self):
+        """
+        Return True if at least one direction would change the board.
+        """
+        # with at least one tile and one empty cell some tile can always slide
+        if 0 < len(self.avi_cells) < self.height * self.width:
+            return True
+        return self.equal_pairs > 0
 
     def __str__(self):
         """
@@ -246,43 +378,33 @@ class TwentyFortyEight:
         # replace with your code
         return self.width
 
+    def get_score(self):
+        """
+        Get the total value of all merges since the last reset.
+        """
+        return self.score
+
     def move(self, direction):
         """
         Move all tiles in the given direction and add
         a new tile if any tiles moved.
         """
         tile_changed = False
+        move_cells = self.move_cells[direction]
 
-        for each in self.ini_tiles[direction]:
-            temp_ls = []
-
-            target_row = each[0]
-            target_col = each[1]
-
-            # add cells to the list until the index exceeds
-            while (target_row, target_col) in self.cells:
-                temp_ls.append(self.cells[(target_row, target_col)])
-                target_row += OFFSETS[direction][0]
-                target_col += OFFSETS[direction][1]
-
-            # merge the line
-            temp_ls = merge(temp_ls)
-
-            # traverse the cells again
-            target_row = each[0]
-            target_col = each[1]
-            ls_index = 0
-
-            # add cells to the list until the index exceeds
-            while (target_row, target_col) in self.cells:
-                # if the new value is not equal to original value, the tile must have changed
-                if self.cells[(target_row, target_col)] != temp_ls[ls_index]:
-                    tile_changed = True
+        # all lines of this direction go through merge in one call
+        if direction == UP or direction == DOWN:
+            line_length = self.height
+        else:
+            line_length = self.width
+        merged, score = merge_lines([self.cells[cell] for cell in move_cells], line_length, self.merge_buffer)[:2]
+        self.score += score
 
-                self.cells[(target_row, target_col)] = temp_ls[ls_index]
-                target_row += OFFSETS[direction][0]
-                target_col += OFFSETS[direction][1]
-                ls_index += 1
+        for cell_index in range(len(move_cells)):
+            # if the new value is not equal to original value, the tile must have changed
+            if self.cells[move_cells[cell_index]] != merged[cell_index]:
+                tile_changed = True
+                self.update_cell(move_cells[cell_index], merged[cell_index])
 
         # if tile has changed, and there is at least one avi cell, then must call new_tile
         if tile_changed:
@@ -294,22 +416,20 @@ class TwentyFortyEight:
         square.  The tile should be 2 90% of the time and
         4 10% of the time.
         """
-        new_row = get_ran_num(self.height)
-        new_col = get_ran_num(self.width)
+        # nowhere to put a new tile
+        if self.is_full():
+            return
 
-        # cannot pick a (row, col) where there is already a tile with valid value
-        while self.get_tile(new_row, new_col) != 0:
-            new_row = get_ran_num(self.height)
-            new_col = get_ran_num(self.width)
-
-        self.cells[(new_row, new_col)] = generate_value()
+        # pick straight from the empty cells instead of retrying random cells
+        new_cell = self.avi_cells[get_ran_num(len(self.avi_cells))]
+        self.update_cell(new_cell, generate_value())
+        self.last_tile = (new_cell[0], new_cell[1], self.cells[new_cell])
 
     def set_tile(self, row, col, value):
         """
         Set the tile at position row, col to have the given value.
         """
-        self.cells[(row, col)] = value
-        self.avi_cells.remove((row, col))
+        self.update_cell((row, col), value)
 
     def get_tile(self, row, col):
         """
@@ -357,4 +477,752 @@ class TwentyFortyEight:
     # print test_grid
 
 
+# Bitboard backend for the classic 4x4 board.
+# The whole grid is packed into one 64-bit integer of 4-bit log2 exponents:
+# cell (row, col) lives in nibble 4 * row + col, 0 means an empty cell and
+# e means a tile of value 2 ** e. Tiles are therefore capped at 32768: setting a
+# larger tile, or a move that would merge two 32768 tiles, raises OverflowError.
+
+BIT_SIZE = 4
+ROW_MASK = 0xFFFF
+CELL_MASK = 0xF
+MAX_EXPONENT = 15
+
+# 65536-entry tables mapping a packed row to the packed row after a move,
+# filled in lazily by build_row_tables()
+ROW_LEFT = []
+ROW_RIGHT = []
+# score of the merges a move makes on each packed row, the same both ways
+ROW_SCORE = []
+# 1 for the rows where a move would make a tile above MAX_EXPONENT
+OVERFLOW_LEFT = bytearray()
+OVERFLOW_RIGHT = bytearray()
+# one bit per nibble, to test all cells at once
+NIBBLE_LOW_BITS = 0x1111111111111111
+
+
+def unpack_row(row):
+    """
+    unpack a 16-bit row into a list of 4 exponents, col 0 first
+    :param row: packed row
+    :return:
+    """
+    return [(row >> (4 * col)) & CELL_MASK for col in range(BIT_SIZE)]
+
+
+def pack_row(exponents):
+    """
+    pack a list of 4 exponents, col 0 first, into a 16-bit row
+    :param exponents: list of exponents
+    :return:
+    """
+    row = 0
+    for col in range(BIT_SIZE):
+        row |= exponents[col] << (4 * col)
+    return row
+
+
+def merge_exponents(exponents):
+    """
+    merge a line of exponents towards index 0, the same way merge() does with tile values.
+    exponents above MAX_EXPONENT can come out, build_row_tables() flags those rows
+    :param exponents: list of exponents
+    :return: (merged exponents, score of the merges)
+    """
+    result = []
+    score = 0
+    last_merged = False
+    for exponent in exponents:
+        if exponent == 0:
+            continue
+        if result and not last_merged and result[-1] == exponent:
+            result[-1] += 1
+            score += 1 << result[-1]
+            last_merged = True
+        else:
+            result.append(exponent)
+            last_merged = False
+    return result + [0] * (len(exponents) - len(result)), score
+
+
+def reverse_row(row):
+    """
+    mirror a packed row so col 0 becomes col 3
+    :param row: packed row
+    :return:
+    """
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def build_row_tables():
+    """
+    fill ROW_LEFT and ROW_RIGHT for all 65536 possible rows. only done once
+    :return:
+    """
+    if ROW_LEFT:
+        return
+
+    left = [0] * (ROW_MASK + 1)
+    right = [0] * (ROW_MASK + 1)
+    scores = [0] * (ROW_MASK + 1)
+    overflow_left = bytearray(ROW_MASK + 1)
+    overflow_right = bytearray(ROW_MASK + 1)
+    for row in range(ROW_MASK + 1):
+        merged, scores[row] = merge_exponents(unpack_row(row))
+        if max(merged) > MAX_EXPONENT:
+            # never used, move() raises before reading these rows
+            overflow_left[row] = 1
+            overflow_right[reverse_row(row)] = 1
+            continue
+        moved = pack_row(merged)
+        left[row] = moved
+        # moving right is moving left on the mirrored row
+        right[reverse_row(row)] = reverse_row(moved)
+
+    ROW_LEFT.extend(left)
+    ROW_RIGHT.extend(right)
+    ROW_SCORE.extend(scores)
+    OVERFLOW_LEFT.extend(overflow_left)
+    OVERFLOW_RIGHT.extend(overflow_right)
+
+
+def transpose_board(board):
+    """
+    transpose a packed 4x4 board, so that (row, col) goes to (col, row)
+    :param board: packed board
+    :return:
+    """
+    # swap the off-diagonal nibbles inside each 2x2 block
+    part1 = board & 0xF0F00F0FF0F00F0F
+    part2 = board & 0x0000F0F00000F0F0
+    part3 = board & 0x0F0F00000F0F0000
+    board = part1 | (part2 << 12) | (part3 >> 12)
+    # then swap the off-diagonal 2x2 blocks
+    part1 = board & 0xFF00FF0000FF00FF
+    part2 = board & 0x00FF00FF00000000
+    part3 = board & 0x00000000FF00FF00
+    return part1 | (part2 >> 24) | (part3 << 24)
+
+
+def move_rows(board, table):
+    """
+    apply a row table to all 4 rows of a packed board
+    :param board: packed board
+    :param table: ROW_LEFT or ROW_RIGHT
+    :return:
+    """
+    return (table[board & ROW_MASK] |
+            (table[(board >> 16) & ROW_MASK] << 16) |
+            (table[(board >> 32) & ROW_MASK] << 32) |
+            (table[(board >> 48) & ROW_MASK] << 48))
+
+
+def move_board(board, direction):
+    """
+    return the packed board after sliding it in the given direction, no new tile added
+    :param board: packed board
+    :param direction: UP, DOWN, LEFT or RIGHT
+    :return:
+    """
+    if direction == LEFT:
+        return move_rows(board, ROW_LEFT)
+    elif direction == RIGHT:
+        return move_rows(board, ROW_RIGHT)
+    # columns become rows after a transpose, with row 0 at the left
+    elif direction == UP:
+        return transpose_board(move_rows(transpose_board(board), ROW_LEFT))
+    else:
+        return transpose_board(move_rows(transpose_board(board), ROW_RIGHT))
+
+
+def board_rows(board, direction):
+    """
+    the 4 packed rows a move in the given direction works on: the rows for LEFT and RIGHT,
+    the columns (row 0 at the left) for UP and DOWN
+    :param board: packed board
+    :param direction: UP, DOWN, LEFT or RIGHT
+    :return: list of 4 packed rows
+    """
+    if direction == UP or direction == DOWN:
+        board = transpose_board(board)
+    return [(board >> shift) & ROW_MASK for shift in range(0, 64, 16)]
+
+
+def empty_nibbles(board):
+    """
+    one bit (the low bit of the nibble) for every empty cell of a packed board
+    :param board: packed board
+    :return:
+    """
+    return ~(board | (board >> 1) | (board >> 2) | (board >> 3)) & NIBBLE_LOW_BITS
+
+
+def tile_to_exponent(value):
+    """
+    convert a tile value (0, 2, 4, 8...) into its exponent
+    :param value: tile value
+    :return:
+    """
+    if value == 0:
+        return 0
+    exponent = 0
+    while value > 1:
+        value >>= 1
+        exponent += 1
+    if exponent > MAX_EXPONENT:
+        raise OverflowError("tile " + str(1 << exponent) + " does not fit in the bitboard")
+    return exponent
+
+
+class TwentyFortyEightBitboard:
+    """
+    Same game logic as TwentyFortyEight, for 4x4 boards only, stored as a single 64-bit integer.
+    """
+
+    def __init__(self, grid_height=BIT_SIZE, grid_width=BIT_SIZE):
+        assert grid_height == BIT_SIZE and grid_width == BIT_SIZE, "bitboard only supports 4x4 grids"
+        build_row_tables()
+        self.height = grid_height
+        self.width = grid_width
+        self.board = 0
+        self.last_tile = None
+        self.score = 0
+
+    def reset(self):
+        """
+        Reset the game so the grid is empty.
+        """
+        self.board = 0
+        self.score = 0
+
+    def __str__(self):
+        """
+        Return a string representation of the grid for debugging.
+        """
+        string = ""
+        for row in range(self.height):
+            string += ", ".join([str(self.get_tile(row, col)) for col in range(self.width)]) + "\n"
+        return string
+
+    def get_grid_height(self):
+        """
+        Get the height of the board.
+        """
+        return self.height
+
+    def get_grid_width(self):
+        """
+        Get the width of the board.
+        """
+        return self.width
+
+    def get_score(self):
+        """
+        Get the total value of all merges since the last reset.
+        """
+        return self.score
+
+    def is_full(self):
+        """
+        Return True if there is no empty cell left.
+        """
+        return empty_nibbles(self.board) == 0
+
+    def can_move(self):
+        """
+        Return True if at least one direction would change the board.
+        """
+        if empty_nibbles(self.board):
+            return self.board != 0
+        # a full board moves only if two equal tiles touch; merging two 32768 counts too
+        for direction, table, overflow in [(LEFT, ROW_LEFT, OVERFLOW_LEFT), (UP, ROW_LEFT, OVERFLOW_LEFT)]:
+            for row in board_rows(self.board, direction):
+                if overflow[row] or table[row] != row:
+                    return True
+        return False
+
+    def move(self, direction):
+        """
+        Move all tiles in the given direction and add
+        a new tile if any tiles moved.
+        """
+        board = self.board
+        # only a board holding a 32768 tile can overflow
+        if board & (board >> 1) & (board >> 2) & (board >> 3) & NIBBLE_LOW_BITS:
+            if direction == LEFT or direction == UP:
+                overflow = OVERFLOW_LEFT
+            else:
+                overflow = OVERFLOW_RIGHT
+            for row in board_rows(board, direction):
+                if overflow[row]:
+                    raise OverflowError("merge above 32768 does not fit in the bitboard")
+        new_board = move_board(board, direction)
+        if new_board != board:
+            self.board = new_board
+            self.score += sum([ROW_SCORE[row] for row in board_rows(board, direction)])
+            self.new_tile()
+
+    def new_tile(self):
+        """
+        Create a new tile in a randomly selected empty
+        square.  The tile should be 2 90% of the time and
+        4 10% of the time.
+        """
+        empty = [shift for shift in range(0, 64, 4) if (self.board >> shift) & CELL_MASK == 0]
+        if not empty:
+            return
+        shift = empty[get_ran_num(len(empty))]
+        value = generate_value()
+        self.board |= tile_to_exponent(value) << shift
+        self.last_tile = (shift // 4 // BIT_SIZE, shift // 4 % BIT_SIZE, value)
+
+    def set_tile(self, row, col, value):
+        """
+        Set the tile at position row, col to have the given value.
+        """
+        shift = 4 * (BIT_SIZE * row + col)
+        self.board = (self.board & ~(CELL_MASK << shift)) | (tile_to_exponent(value) << shift)
+
+    def get_tile(self, row, col):
+        """
+        Return the value of the tile at position row, col.
+        """
+        exponent = (self.board >> (4 * (BIT_SIZE * row + col))) & CELL_MASK
+        if exponent == 0:
+            return 0
+        return 1 << exponent
+
+
+def benchmark_backends(num_moves=20000, seed=2048):
+    """
+    time the dict based TwentyFortyEight against TwentyFortyEightFlat and TwentyFortyEightBitboard
+    on the same random move sequence. the board is reset whenever it fills up
+    :param num_moves: number of moves to run for each backend
+    :param seed: random seed, so all backends see the same game
+    :return: dictionary of backend name to moves per second
+    """
+    results = {}
+    for name, game_class in [("dict", TwentyFortyEight), ("flat", TwentyFortyEightFlat),
+                             ("bitboard", TwentyFortyEightBitboard)]:
+        random.seed(seed)
+        directions = [random.choice([UP, DOWN, LEFT, RIGHT]) for dummy in range(num_moves)]
+        game = game_class(4, 4)
+        game.reset()
+        game.new_tile()
+        game.new_tile()
+        start = time.time()
+        for direction in directions:
+            game.move(direction)
+            # a full board can never get a new tile, start over
+            if all(game.get_tile(row, col) != 0 for row in range(4) for col in range(4)):
+                game.reset()
+                game.new_tile()
+        results[name] = num_moves / (time.time() - start)
+    return results
+
+
+# print benchmark_backends()
+
+
+# Expectimax player.
+# Boards are searched as flat tuples of tile values in row-major order, so they can be used
+# directly as transposition table keys. Lines are slid with merge(), walking each direction
+# from its get_initial_tiles() start cells along OFFSETS.
+
+# search depth (in moves) for each number of empty cells, anything above uses the last entry
+DEPTH_BY_EMPTY = [4, 4, 3, 3, 3, 2, 2, 2]
+# chance branches less likely than this are not expanded
+PROB_CUTOFF = 0.0001
+# heuristic weights
+EMPTY_WEIGHT = 270.0
+MERGE_WEIGHT = 70.0
+MONOTONIC_WEIGHT = 47.0
+
+
+def get_line_indices(grid_height, grid_width):
+    """
+    compute, for each direction, the flat indices of every line in the order merge() expects
+    :param grid_height: height
+    :param grid_width: width
+    :return: dictionary of direction to list of index lists
+    """
+    lines = {}
+    for direction, start_cells in get_initial_tiles(grid_width, grid_height).items():
+        lines[direction] = []
+        for start_row, start_col in start_cells:
+            line = []
+            row, col = start_row, start_col
+            while 0 <= row < grid_height and 0 <= col < grid_width:
+                line.append(row * grid_width + col)
+                row += OFFSETS[direction][0]
+                col += OFFSETS[direction][1]
+            lines[direction].append(line)
+    return lines
+
+
+def slide_board(board, line_indices):
+    """
+    slide a flat board along the given lines
+    :param board: tuple of tile values
+    :param line_indices: the lines of one direction, from get_line_indices()
+    :return: new board tuple, equal to board if nothing moved
+    """
+    return slide_flat(board, [idx for line in line_indices for idx in line], len(line_indices[0]))
+
+
+def slide_flat(board, flat_indices, line_length):
+    """
+    slide a flat board along lines already laid end to end, as TwentyFortyEightFlat.move_indices
+    :param board: tuple of tile values
+    :param flat_indices: the indices of all the lines of one direction, one line after the other
+    :param line_length: length of each line
+    :return: new board tuple, equal to board if nothing moved
+    """
+    merged = merge_lines([board[idx] for idx in flat_indices], line_length)[0]
+    new_board = list(board)
+    for pos in range(len(flat_indices)):
+        new_board[flat_indices[pos]] = merged[pos]
+    return tuple(new_board)
+
+
+class ExpectimaxPlayer:
+    """
+    Pick moves for a TwentyFortyEight game by expectimax search.
+    Max nodes try every direction, chance nodes place a 2 or a 4 in every empty cell.
+    """
+
+    def __init__(self, grid_height=4, grid_width=4, prob_cutoff=PROB_CUTOFF, depth_by_empty=None):
+        self.height = grid_height
+        self.width = grid_width
+        self.prob_cutoff = prob_cutoff
+        self.depth_by_empty = depth_by_empty or DEPTH_BY_EMPTY
+        self.lines = get_line_indices(grid_height, grid_width)
+        # every row and column read in one fixed order, used by the heuristic
+        self.rows_and_cols = self.lines[LEFT] + self.lines[UP]
+        # the lines of each direction laid end to end, so slide_flat does not rebuild them at every node
+        self.flat_indices = {}
+        self.line_lengths = {}
+        for direction, lines in self.lines.items():
+            self.flat_indices[direction] = [idx for line in lines for idx in line]
+            self.line_lengths[direction] = len(lines[0])
+        self.trans_table = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Clear the search counters.
+        """
+        self.nodes = 0
+        self.cache_hits = 0
+        self.cache_lookups = 0
+        self.search_time = 0.0
+
+    def get_stats(self):
+        """
+        Return the search counters accumulated since the last reset_stats().
+        """
+        if self.search_time > 0:
+            nodes_per_sec = self.nodes / self.search_time
+        else:
+            nodes_per_sec = 0.0
+        if self.cache_lookups > 0:
+            hit_rate = float(self.cache_hits) / self.cache_lookups
+        else:
+            hit_rate = 0.0
+        return {"nodes": self.nodes,
+                "nodes_per_sec": nodes_per_sec,
+                "cache_hit_rate": hit_rate,
+                "search_time": self.search_time}
+
+    def get_depth(self, board):
+        """
+        Search deeper when there are few empty cells, as the chance nodes are narrower.
+        """
+        num_empty = board.count(0)
+        return self.depth_by_empty[min(num_empty, len(self.depth_by_empty) - 1)]
+
+    def get_move(self, game):
+        """
+        Return the best direction for the given TwentyFortyEight game,
+        or None if no direction changes the board.
+        """
+        board = tuple([game.get_tile(row, col) for row in range(self.height) for col in range(self.width)])
+        start = time.time()
+        # entries are only valid for a single root, as their values depend on the remaining depth
+        self.trans_table = {}
+        depth = self.get_depth(board)
+        best_direction = None
+        best_value = None
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            new_board = slide_flat(board, self.flat_indices[direction], self.line_lengths[direction])
+            if new_board == board:
+                continue
+            value = self.chance_value(new_board, depth, 1.0)
+            if best_value is None or value > best_value:
+                best_value = value
+                best_direction = direction
+        self.search_time += time.time() - start
+        return best_direction
+
+    def max_value(self, board, depth, prob):
+        """
+        Value of a board where it is the player's turn.
+        """
+        self.nodes += 1
+        best_value = None
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            new_board = slide_flat(board, self.flat_indices[direction], self.line_lengths[direction])
+            if new_board == board:
+                continue
+            value = self.chance_value(new_board, depth, prob)
+            if best_value is None or value > best_value:
+                best_value = value
+        # no legal move, the game is lost
+        if best_value is None:
+            return 0.0
+        return best_value
+
+    def chance_value(self, board, depth, prob):
+        """
+        Value of a board where a new tile is about to be placed.
+        """
+        self.nodes += 1
+        if depth <= 1 or prob < self.prob_cutoff:
+            return self.evaluate(board)
+
+        self.cache_lookups += 1
+        key = (board, depth)
+        if key in self.trans_table:
+            self.cache_hits += 1
+            return self.trans_table[key]
+
+        empty = [idx for idx in range(len(board)) if board[idx] == 0]
+        total = 0.0
+        for idx in empty:
+            for tile, tile_prob in ((2, 1.0 - PROB_FOUR), (4, PROB_FOUR)):
+                branch_prob = prob * tile_prob / len(empty)
+                new_board = board[:idx] + (tile,) + board[idx + 1:]
+                total += tile_prob * self.max_value(new_board, depth - 1, branch_prob)
+        value = total / len(empty)
+
+        self.trans_table[key] = value
+        return value
+
+    def evaluate(self, board):
+        """
+        Heuristic value of a board: reward empty cells, adjacent equal tiles and monotonic lines.
+        """
+        value = EMPTY_WEIGHT * board.count(0)
+        for line in self.rows_and_cols:
+            tiles = [board[idx] for idx in line if board[idx] != 0]
+            increasing = 0
+            decreasing = 0
+            for pos in range(len(tiles) - 1):
+                if tiles[pos] == tiles[pos + 1]:
+                    value += MERGE_WEIGHT
+                elif tiles[pos] < tiles[pos + 1]:
+                    increasing += tiles[pos + 1] - tiles[pos]
+                else:
+                    decreasing += tiles[pos] - tiles[pos + 1]
+            # only penalise the direction that breaks monotonicity the least
+            value -= MONOTONIC_WEIGHT * min(increasing, decreasing)
+        return value
+
+
+def play_expectimax(game, player, max_moves=None):
+    """
+    Let the player play the game until it cannot move any more
+    :param game: TwentyFortyEight, already reset with its starting tiles
+    :param player: ExpectimaxPlayer for the same grid size
+    :param max_moves: stop early after this many moves
+    :return: number of moves played
+    """
+    moves = 0
+    while max_moves is None or moves < max_moves:
+        direction = player.get_move(game)
+        if direction is None:
+            break
+        game.move(direction)
+        moves += 1
+    return moves
+
+
+# test_game = TwentyFortyEight(4, 4)
+# test_game.reset()
+# test_game.new_tile()
+# test_game.new_tile()
+# test_player = ExpectimaxPlayer(4, 4)
+# play_expectimax(test_game, test_player, 200)
+# print test_game
+# print test_player.get_stats()
+
+
+def new_tile_rejection(game):
+    """
+    the old new_tile(): retry random cells until an empty one comes up. kept for benchmarking
+    :param game: TwentyFortyEight with at least one empty cell
+    :return:
+    """
+    new_row = get_ran_num(game.height)
+    new_col = get_ran_num(game.width)
+    while game.get_tile(new_row, new_col) != 0:
+        new_row = get_ran_num(game.height)
+        new_col = get_ran_num(game.width)
+    game.set_tile(new_row, new_col, generate_value())
+
+
+def benchmark_new_tile(grid_size=64, fill=0.999, num_tiles=2000, seed=2048):
+    """
+    time new_tile() against rejection sampling on a large board kept at a high fill ratio.
+    each round clears one random tile and places a new one
+    :param grid_size: height and width of the board
+    :param fill: fraction of cells holding a tile
+    :param num_tiles: number of tiles to place with each method
+    :param seed: random seed
+    :return: dictionary of method name to new tiles per second
+    """
+    results = {}
+    for name, place_tile in [("rejection", new_tile_rejection), ("indexed", TwentyFortyEight.new_tile)]:
+        random.seed(seed)
+        game = TwentyFortyEight(grid_size, grid_size)
+        cells = [(row, col) for row in range(grid_size) for col in range(grid_size)]
+        random.shuffle(cells)
+        for row, col in cells[:int(fill * len(cells))]:
+            game.set_tile(row, col, 2)
+        start = time.time()
+        for dummy in range(num_tiles):
+            row, col = random.choice(cells)
+            game.set_tile(row, col, 0)
+            place_tile(game)
+        results[name] = num_tiles / (time.time() - start)
+    return results
+
+
+# print benchmark_new_tile()
+
+
+class TwentyFortyEightFlat(object):
+    """
+    Same game logic as TwentyFortyEight for any board size, stored in a flat array in row-major order.
+    The cell order of each direction is worked out once, so a move is a gather, a merge_lines() call
+    and a scatter.
+    """
+
+    __slots__ = ("height", "width", "grid", "move_indices", "line_lengths", "merge_buffer", "last_tile",
+                 "score")
+
+    def __init__(self, grid_height, grid_width):
+        self.height = grid_height
+        self.width = grid_width
+        self.grid = array.array("l", [0] * (grid_height * grid_width))
+        self.move_indices = {}
+        self.line_lengths = {}
+        for direction, lines in get_line_indices(grid_height, grid_width).items():
+            self.move_indices[direction] = [idx for line in lines for idx in line]
+            self.line_lengths[direction] = len(lines[0])
+        self.merge_buffer = [0] * (grid_height * grid_width)
+        self.last_tile = None
+        self.score = 0
+
+    def reset(self):
+        """
+        Reset the game so the grid is empty.
+        """
+        for idx in range(len(self.grid)):
+            self.grid[idx] = 0
+        self.score = 0
+
+    def __str__(self):
+        """
+        Return a string representation of the grid for debugging.
+        """
+        string = ""
+        for row in range(self.height):
+            string += ", ".join([str(value) for value in self.grid[row * self.width:(row + 1) * self.width]]) + "\n"
+        return string
+
+    def get_grid_height(self):
+        """
+        Get the height of the board.
+        """
+        return self.height
+
+    def get_grid_width(self):
+        """
+        Get the width of the board.
+        """
+        return self.width
+
+    def get_score(self):
+        """
+        Get the total value of all merges since the last reset.
+        """
+        return self.score
+
+    def move(self, direction):
+        """
+        Move all tiles in the given direction and add
+        a new tile if any tiles moved.
+        """
+        grid = self.grid
+        indices = self.move_indices[direction]
+        merged, score = merge_lines([grid[idx] for idx in indices], self.line_lengths[direction], self.merge_buffer)[:2]
+        self.score += score
+
+        tile_changed = False
+        for pos in range(len(indices)):
+            if grid[indices[pos]] != merged[pos]:
+                grid[indices[pos]] = merged[pos]
+                tile_changed = True
+
+        if tile_changed:
+            self.new_tile()
+
+    def new_tile(self):
+        """
+        Create a new tile in a randomly selected empty
+        square.  The tile should be 2 90% of the time and
+        4 10% of the time.
+        """
+        empty = [idx for idx in range(len(self.grid)) if self.grid[idx] == 0]
+        if not empty:
+            return
+        idx = empty[get_ran_num(len(empty))]
+        self.grid[idx] = generate_value()
+        self.last_tile = (idx // self.width, idx % self.width, self.grid[idx])
+
+    def is_full(self):
+        """
+        Return True if there is no empty cell left.
+        """
+        return 0 not in self.grid
+
+    def can_move(self):
+        """
+        Return True if at least one direction would change the board.
+        """
+        grid = self.grid
+        if 0 in grid:
+            return any(grid)
+        for idx in range(len(grid)):
+            # compare with the right and the lower neighbour
+            if (idx + 1) % self.width != 0 and grid[idx] == grid[idx + 1]:
+                return True
+            if idx + self.width < len(grid) and grid[idx] == grid[idx + self.width]:
+                return True
+        return False
+
+    def set_tile(self, row, col, value):
+        """
+        Set the tile at position row, col to have the given value.
+        """
+        self.grid[row * self.width + col] = value
+
+    def get_tile(self, row, col):
+        """
+        Return the value of the tile at position row, col.
+        """
+        return self.grid[row * self.width + col]
+
+
     # poc_2048_gui.run_gui(TwentyFortyEight(4, 4))
\ No newline at end of file
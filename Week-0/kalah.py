@@ -0,0 +1,347 @@
+"""
+Two player Kalah on the Solitaire Mancala board model, with an alpha-beta search engine.
+
+Each side is laid out like a SolitaireMancala board: its store at index 0 and its houses at 1..n,
+sowing towards the store. Side 0 uses board[0..n] and side 1 uses board[n + 1..2n + 1].
+After the own store, sowing goes on in the opponent's houses from n down to 1, skips the
+opponent's store and comes back to the own house n. House k faces the opponent's house n + 1 - k.
+"""
+
+import random
+import time
+
+# Search constants
+WIN_SCORE = 100000
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+# how often (in nodes) the clock is looked at
+TIME_CHECK_NODES = 1024
+
+
+class KalahState:
+    """
+    Kalah position with make/unmake moves and an incrementally updated Zobrist hash.
+    """
+
+    def __init__(self, house_num=6, seeds=4, zobrist_seed=0):
+        self.house_num = house_num
+        self.size = 2 * (house_num + 1)
+        self.board = [0] * self.size
+        for side in range(2):
+            for house in range(1, house_num + 1):
+                self.board[self.pit(side, house)] = seeds
+        self.side = 0
+        # seeds in the houses (not the store) of each side, to detect the end of the game in O(1)
+        self.side_seeds = [house_num * seeds, house_num * seeds]
+
+        # next_pit[side][pit] is where a seed sown by side goes after pit
+        self.next_pit = [[0] * self.size, [0] * self.size]
+        for side in range(2):
+            other = 1 - side
+            for house in range(1, house_num + 1):
+                self.next_pit[side][self.pit(side, house)] = self.pit(side, house - 1)
+                if house > 1:
+                    self.next_pit[side][self.pit(other, house)] = self.pit(other, house - 1)
+                else:
+                    self.next_pit[side][self.pit(other, house)] = self.pit(side, house_num)
+            self.next_pit[side][self.pit(side, 0)] = self.pit(other, house_num)
+
+        total = 2 * house_num * seeds
+        rng = random.Random(zobrist_seed)
+        self.zobrist = [[rng.getrandbits(64) for dummy in range(total + 1)] for dummy in range(self.size)]
+        self.zobrist_side = rng.getrandbits(64)
+        self.hash = 0
+        for pit in range(self.size):
+            self.hash ^= self.zobrist[pit][self.board[pit]]
+
+    def pit(self, side, house):
+        """
+        Index in board of the given side's house (0 for its store).
+        """
+        return side * (self.house_num + 1) + house
+
+    def __str__(self):
+        # side 1 on top, read from its house 1 to its store so the board reads counterclockwise
+        top = [self.board[self.pit(1, house)] for house in range(self.house_num + 1)]
+        bottom = [self.board[self.pit(0, house)] for house in range(self.house_num, -1, -1)]
+        return str(top) + "\n" + str(bottom)
+
+    def legal_moves(self):
+        """
+        Return the houses (1..n) of the side to move that hold seeds.
+        """
+        base = self.pit(self.side, 0)
+        return [house for house in range(1, self.house_num + 1) if self.board[base + house] > 0]
+
+    def is_game_over(self):
+        """
+        The game ends when either side has no seed left in its houses.
+        """
+        return self.side_seeds[0] == 0 or self.side_seeds[1] == 0
+
+    def final_score(self):
+        """
+        Score of side 0 minus side 1 once the game is over, each side keeping the seeds in its houses.
+        """
+        store0 = self.board[self.pit(0, 0)] + self.side_seeds[0]
+        store1 = self.board[self.pit(1, 0)] + self.side_seeds[1]
+        return store0 - store1
+
+    def add_seeds(self, pit, amount):
+        """
+        Change the seeds in one pit, keeping the hash and side counts up to date.
+        """
+        old = self.board[pit]
+        self.board[pit] = old + amount
+        self.hash ^= self.zobrist[pit][old] ^ self.zobrist[pit][old + amount]
+        if pit % (self.house_num + 1) != 0:
+            self.side_seeds[pit // (self.house_num + 1)] += amount
+
+    def make_move(self, house):
+        """
+        Sow the given house of the side to move. Returns the undo record for unmake_move().
+        """
+        side = self.side
+        start = self.pit(side, house)
+        seeds = self.board[start]
+        next_pit = self.next_pit[side]
+        self.add_seeds(start, -seeds)
+
+        pit = start
+        for dummy in range(seeds):
+            pit = next_pit[pit]
+            self.add_seeds(pit, 1)
+
+        # last seed in an own empty house captures the opposite house, if it has seeds
+        captured = 0
+        own_base = self.pit(side, 0)
+        local = pit - own_base
+        if 0 < local <= self.house_num and self.board[pit] == 1:
+            opposite = self.pit(1 - side, self.house_num + 1 - local)
+            captured = self.board[opposite]
+            if captured > 0:
+                self.add_seeds(opposite, -captured)
+                self.add_seeds(pit, -1)
+                self.add_seeds(own_base, captured + 1)
+
+        # the side moves again if the last seed lands in its store
+        if pit != own_base:
+            self.side = 1 - side
+            self.hash ^= self.zobrist_side
+        return (house, seeds, pit, captured, side)
+
+    def unmake_move(self, undo):
+        """
+        Take back the move described by undo.
+        """
+        house, seeds, last, captured, side = undo
+        if self.side != side:
+            self.side = side
+            self.hash ^= self.zobrist_side
+
+        own_base = self.pit(side, 0)
+        if captured > 0:
+            local = last - own_base
+            self.add_seeds(own_base, -(captured + 1))
+            self.add_seeds(last, 1)
+            self.add_seeds(self.pit(1 - side, self.house_num + 1 - local), captured)
+
+        start = self.pit(side, house)
+        next_pit = self.next_pit[side]
+        pit = start
+        for dummy in range(seeds):
+            pit = next_pit[pit]
+            self.add_seeds(pit, -1)
+        self.add_seeds(start, seeds)
+
+
+class KalahEngine:
+    """
+    Iterative deepening alpha-beta (negamax) search with a bounded transposition table.
+    """
+
+    def __init__(self, tt_size=1 << 18):
+        self.tt_size = tt_size
+        # each slot is (hash, depth, value, flag, best house, search number) or None
+        self.trans_table = [None] * tt_size
+        self.search_number = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Clear the search counters.
+        """
+        self.nodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.search_time = 0.0
+
+    def get_stats(self):
+        """
+        Return the search counters accumulated since the last reset_stats().
+        """
+        if self.search_time > 0:
+            nodes_per_sec = self.nodes / self.search_time
+        else:
+            nodes_per_sec = 0.0
+        if self.tt_probes > 0:
+            hit_rate = float(self.tt_hits) / self.tt_probes
+        else:
+            hit_rate = 0.0
+        return {"nodes": self.nodes,
+                "nodes_per_sec": nodes_per_sec,
+                "tt_hit_rate": hit_rate,
+                "search_time": self.search_time}
+
+    def store(self, state, depth, value, flag, best_house):
+        """
+        Save a result. A slot is replaced if it is from an older search or was searched less deep.
+        """
+        slot = state.hash % self.tt_size
+        entry = self.trans_table[slot]
+        if entry is None or entry[5] != self.search_number or depth >= entry[1]:
+            self.trans_table[slot] = (state.hash, depth, value, flag, best_house, self.search_number)
+
+    def evaluate(self, state):
+        """
+        Store difference from the point of view of the side to move.
+        """
+        if state.is_game_over():
+            score = state.final_score()
+            if score != 0:
+                score += WIN_SCORE if score > 0 else -WIN_SCORE
+        else:
+            score = state.board[state.pit(0, 0)] - state.board[state.pit(1, 0)]
+        if state.side == 1:
+            return -score
+        return score
+
+    def get_move(self, state, time_budget=1.0, max_depth=64):
+        """
+        Return the best house for the side to move, searching deeper until time_budget seconds are used.
+        """
+        self.search_number += 1
+        self.deadline = time.time() + time_budget
+        self.timed_out = False
+        start = time.time()
+        moves = state.legal_moves()
+        best_house = moves[0] if moves else None
+
+        for depth in range(1, max_depth + 1):
+            value, house = self.search_root(state, depth)
+            # an interrupted iteration is incomplete, keep the previous answer
+            if self.timed_out:
+                break
+            best_house = house
+            if abs(value) >= WIN_SCORE:
+                break
+        self.search_time += time.time() - start
+        return best_house
+
+    def search_root(self, state, depth):
+        """
+        Search every root move to the given depth, returning (value, best house).
+        """
+        best_value = -WIN_SCORE * 2
+        best_house = None
+        for house in self.order_moves(state):
+            side = state.side
+            undo = state.make_move(house)
+            if state.side == side:
+                value = self.negamax(state, depth - 1, best_value, WIN_SCORE * 2)
+            else:
+                value = -self.negamax(state, depth - 1, -WIN_SCORE * 2, -best_value)
+            state.unmake_move(undo)
+            if self.timed_out:
+                break
+            if value > best_value:
+                best_value = value
+                best_house = house
+        if not self.timed_out:
+            self.store(state, depth, best_value, TT_EXACT, best_house)
+        return best_value, best_house
+
+    def order_moves(self, state):
+        """
+        Try the table's best move first, then moves that end in the own store.
+        """
+        moves = state.legal_moves()
+        entry = self.trans_table[state.hash % self.tt_size]
+        tt_house = entry[4] if entry is not None and entry[0] == state.hash else None
+        # house k needs exactly k seeds to end in the store (when it does not wrap around)
+        base = state.pit(state.side, 0)
+        moves.sort(key=lambda house: (house != tt_house, state.board[base + house] != house))
+        return moves
+
+    def negamax(self, state, depth, alpha, beta):
+        """
+        Value of state for the side to move, within the (alpha, beta) window.
+        """
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_NODES == 0 and time.time() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return 0
+        if depth <= 0 or state.is_game_over():
+            return self.evaluate(state)
+
+        self.tt_probes += 1
+        entry = self.trans_table[state.hash % self.tt_size]
+        if entry is not None and entry[0] == state.hash and entry[1] >= depth:
+            self.tt_hits += 1
+            value, flag = entry[2], entry[3]
+            if flag == TT_EXACT:
+                return value
+            elif flag == TT_LOWER and value >= beta:
+                return value
+            elif flag == TT_UPPER and value <= alpha:
+                return value
+
+        original_alpha = alpha
+        best_value = -WIN_SCORE * 2
+        best_house = None
+        for house in self.order_moves(state):
+            side = state.side
+            undo = state.make_move(house)
+            # an extra turn keeps the same side to move, so the value is not negated
+            if state.side == side:
+                value = self.negamax(state, depth - 1, alpha, beta)
+            else:
+                value = -self.negamax(state, depth - 1, -beta, -alpha)
+            state.unmake_move(undo)
+            if value > best_value:
+                best_value = value
+                best_house = house
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if not self.timed_out:
+            if best_value <= original_alpha:
+                flag = TT_UPPER
+            elif best_value >= beta:
+                flag = TT_LOWER
+            else:
+                flag = TT_EXACT
+            self.store(state, depth, best_value, flag, best_house)
+        return best_value
+
+
+def play_engines(engine0, engine1, house_num=6, seeds=4, time_budget=0.1):
+    """
+    Play one game between two engines and return the final score of side 0 minus side 1.
+    """
+    state = KalahState(house_num, seeds)
+    engines = [engine0, engine1]
+    while not state.is_game_over():
+        state.make_move(engines[state.side].get_move(state, time_budget))
+    return state.final_score()
+
+
+# test_state = KalahState(6, 4)
+# test_engine = KalahEngine()
+# print test_engine.get_move(test_state, 1.0)
+# print test_engine.get_stats()
+# print play_engines(KalahEngine(), KalahEngine())
@@ -1,4 +1,6 @@
-lass SolitaireMancala:
+import time
+
+class SolitaireMancala:
 
     def __init__(self):
         self.board = [0]
@@ -49,6 +51,116 @@ lass SolitaireMancala:
         reversed_board = [self.board[i] for i in range(len(self.board)-1, -1, -1)]
         return str(reversed_board)
 
+# Same game, with a plan_moves that does not rescan the board for every move.
+# The lowest legal house h is always played, so sowing only touches houses below h and can
+# never make a legal house illegal. The houses that become legal while sowing h are all below h
+# and are pushed on a stack, lowest on top, so the next move is the top of the stack; only when
+# the stack is empty is the board scanned upwards, from where the last scan stopped. A plan then
+# costs the sowing plus one pass over the board, instead of a scan from house 1 for every move.
+class IncrementalMancala(SolitaireMancala):
+
+    def plan_moves(self):
+        board = list(self.board)
+        moves = []
+        legal_stack = []
+        next_scan = 1
+        while True:
+            if not legal_stack:
+                while next_scan < len(board) and board[next_scan] != next_scan:
+                    next_scan += 1
+                if next_scan == len(board):
+                    break
+                legal_stack.append(next_scan)
+                next_scan += 1
+            house_num = legal_stack.pop()
+            moves.append(house_num)
+            board[0] += 1
+            # walk down so the lowest new legal house is pushed last
+            for i in range(house_num - 1, 0, -1):
+                board[i] += 1
+                if board[i] == i:
+                    legal_stack.append(i)
+            board[house_num] = 0
+        return moves
+
+def benchmark_planners(house_num=2000, num_boards=100):
+    # plan_moves on a long board where every house starts legal, and on the winnable boards
+    # with up to num_boards seeds, which are played until every house is empty
+    boards = [[0] + list(range(1, house_num + 1))]
+    enumerator = WinnableBoardEnumerator(house_num, num_boards)
+    boards.extend(enumerator.gen_boards())
+    results = {}
+    plans = {}
+    for name, game in [("scan", SolitaireMancala()), ("incremental", IncrementalMancala())]:
+        plans[name] = []
+        start = time.time()
+        for board in boards:
+            plans[name].append(game.set_board(board).plan_moves())
+        results[name] = time.time() - start
+    assert plans["scan"] == plans["incremental"], "plans differ"
+    results["moves"] = sum([len(plan) for plan in plans["scan"]])
+    return results
+
+# print benchmark_planners()
+
+# Enumerate winnable boards backwards: un-applying a move to house i needs house i empty and
+# at least one seed in every house before it (the store can always give one back). Every board
+# reached that way from the empty board can be won by replaying the moves forwards.
+class WinnableBoardEnumerator:
+
+    def __init__(self, max_houses, max_seeds):
+        self.max_houses = max_houses
+        self.max_seeds = max_seeds
+        self.states = 0
+        self.elapsed = 0.0
+
+    def unapply_move(self, board, house_num):
+        if board[house_num] != 0:
+            return None
+        for i in range(1, house_num):
+            if board[i] == 0:
+                return None
+        previous = list(board)
+        for i in range(1, house_num):
+            previous[i] -= 1
+        previous[house_num] = house_num
+        return tuple(previous)
+
+    def gen_boards(self):
+        # boards are tuples of max_houses + 1 entries with an empty store, and are yielded
+        # without their trailing empty houses; padding them with empty houses keeps them winnable
+        start = time.time()
+        self.states = 0
+        empty = (0,) * (self.max_houses + 1)
+        visited = set([empty])
+        frontier = [empty]
+        # every un-applied move adds exactly one seed, so each frontier has one more seed
+        for dummy_seeds in range(self.max_seeds):
+            next_frontier = []
+            for board in frontier:
+                for house_num in range(1, self.max_houses + 1):
+                    previous = self.unapply_move(board, house_num)
+                    if previous is None or previous in visited:
+                        continue
+                    visited.add(previous)
+                    next_frontier.append(previous)
+                    self.states += 1
+                    self.elapsed = time.time() - start
+                    last = max([i for i in range(len(previous)) if previous[i] != 0])
+                    yield list(previous[:last + 1])
+            frontier = next_frontier
+        self.elapsed = time.time() - start
+
+    def states_per_second(self):
+        if self.elapsed == 0:
+            return 0.0
+        return self.states / self.elapsed
+
+# enumerator = WinnableBoardEnumerator(30, 300)
+# for winnable_board in enumerator.gen_boards():
+#     assert SolitaireMancala().set_board(winnable_board).plan_moves() != []
+# print enumerator.states, enumerator.states_per_second()
+
 # import poc_mancala_testsuite
 # poc_mancala_testsuite.run_test(SolitaireMancala)
 
@@ -0,0 +1,185 @@
+"""
+Batch 2048 engine: N games of the same size stepped together with NumPy.
+"""
+
+import importlib
+import time
+import numpy as np
+
+# game-2048.py cannot be imported with a plain import statement because of the dash
+game = importlib.import_module("game-2048")
+
+
+def batch_merge(lines):
+    """
+    vectorized merge(): merge every row of a 2D array towards column 0
+    :param lines: (num_lines, length) array of tile values
+    :return: tuple of (merged lines, score gained per line)
+    """
+    lines = compact(lines)
+    score = np.zeros(lines.shape[0], dtype=lines.dtype)
+    for pos in range(lines.shape[1] - 1):
+        # after a merge the right tile becomes 0, so it cannot merge again with the next one
+        same = (lines[:, pos] == lines[:, pos + 1]) & (lines[:, pos] != 0)
+        lines[same, pos] *= 2
+        lines[same, pos + 1] = 0
+        score[same] += lines[same, pos]
+    return compact(lines), score
+
+
+def compact(lines):
+    """
+    slide the non-zero tiles of every row to the front, keeping their order
+    :param lines: (num_lines, length) array
+    :return: new array
+    """
+    order = np.argsort(lines == 0, axis=1, kind="stable")
+    return np.take_along_axis(lines, order, axis=1)
+
+
+def to_left(boards, direction):
+    """
+    view a (N, H, W) stack of boards so that moving in direction becomes moving left
+    :param boards: stack of boards
+    :param direction: UP, DOWN, LEFT or RIGHT
+    :return:
+    """
+    if direction == game.LEFT:
+        return boards
+    elif direction == game.RIGHT:
+        return boards[:, :, ::-1]
+    elif direction == game.UP:
+        return boards.transpose(0, 2, 1)
+    else:
+        return boards.transpose(0, 2, 1)[:, :, ::-1]
+
+
+def from_left(boards, direction):
+    """
+    undo to_left()
+    :param boards: stack of boards
+    :param direction: UP, DOWN, LEFT or RIGHT
+    :return:
+    """
+    if direction == game.LEFT:
+        return boards
+    elif direction == game.RIGHT:
+        return boards[:, :, ::-1]
+    elif direction == game.UP:
+        return boards.transpose(0, 2, 1)
+    else:
+        return boards[:, :, ::-1].transpose(0, 2, 1)
+
+
+class BatchTwentyFortyEight:
+    """
+    Hold many TwentyFortyEight games in one (N, H, W) array.
+    """
+
+    def __init__(self, num_games, grid_height, grid_width, seed=None):
+        self.num_games = num_games
+        self.height = grid_height
+        self.width = grid_width
+        self.rng = np.random.RandomState(seed)
+        self.boards = np.zeros((num_games, grid_height, grid_width), dtype=np.int64)
+
+    def reset(self):
+        """
+        Reset every game to an empty grid.
+        """
+        self.boards[:] = 0
+
+    def get_boards(self):
+        """
+        Return the (N, H, W) array of tile values.
+        """
+        return self.boards
+
+    def new_tiles(self, mask=None):
+        """
+        Add one tile (2 90% of the time, 4 10% of the time) in a uniformly random
+        empty cell of every game selected by mask. Full games are left alone.
+        """
+        flat = self.boards.reshape(self.num_games, -1)
+        if mask is None:
+            mask = np.ones(self.num_games, dtype=bool)
+        mask = mask & (flat == 0).any(axis=1)
+        # the empty cell with the highest random key is a uniform pick among the empty cells
+        keys = self.rng.random_sample(flat.shape)
+        keys[flat != 0] = -1.0
+        cells = keys.argmax(axis=1)
+        values = np.where(self.rng.random_sample(self.num_games) < game.PROB_FOUR, 4, 2)
+        games = np.nonzero(mask)[0]
+        flat[games, cells[games]] = values[games]
+
+    def move(self, directions):
+        """
+        Move every game in its direction and add a new tile to the games that changed.
+        directions is either one direction for all games or an array with one per game.
+        Returns (changed, score_delta, game_over) arrays of length N.
+        """
+        changed = np.zeros(self.num_games, dtype=bool)
+        score = np.zeros(self.num_games, dtype=self.boards.dtype)
+        if np.isscalar(directions):
+            groups = [(directions, np.arange(self.num_games))]
+        else:
+            directions = np.asarray(directions)
+            groups = [(direction, np.nonzero(directions == direction)[0])
+                      for direction in (game.UP, game.DOWN, game.LEFT, game.RIGHT)]
+
+        for direction, games in groups:
+            if len(games) == 0:
+                continue
+            old = self.boards[games]
+            left = to_left(old, direction)
+            lines, line_score = batch_merge(left.reshape(-1, left.shape[2]))
+            new = from_left(lines.reshape(left.shape), direction)
+            changed[games] = (new != old).any(axis=(1, 2))
+            score[games] = line_score.reshape(len(games), -1).sum(axis=1)
+            self.boards[games] = new
+
+        self.new_tiles(changed)
+        return changed, score, self.game_over()
+
+    def game_over(self):
+        """
+        Return a boolean array, True for games with no empty cell and no possible merge.
+        """
+        boards = self.boards
+        has_empty = (boards == 0).any(axis=(1, 2))
+        row_merge = (boards[:, :, 1:] == boards[:, :, :-1]).any(axis=(1, 2))
+        col_merge = (boards[:, 1:, :] == boards[:, :-1, :]).any(axis=(1, 2))
+        return ~(has_empty | row_merge | col_merge)
+
+
+def benchmark_batch(num_games=10000, grid_height=4, grid_width=4, seed=2048):
+    """
+    play num_games random-move games to completion in one batch
+    :param num_games: batch size
+    :param grid_height: height
+    :param grid_width: width
+    :param seed: random seed
+    :return: dictionary with games per second, moves per second and the mean score
+    """
+    batch = BatchTwentyFortyEight(num_games, grid_height, grid_width, seed)
+    batch.new_tiles()
+    batch.new_tiles()
+    rng = np.random.RandomState(seed)
+    total_score = np.zeros(num_games, dtype=np.int64)
+    over = batch.game_over()
+    moves = 0
+    start = time.time()
+    while not over.all():
+        directions = rng.randint(game.UP, game.RIGHT + 1, size=num_games)
+        changed, score, now_over = batch.move(directions)
+        # finished games may still be stepped, but nothing changes for them
+        total_score += np.where(over, 0, score)
+        moves += int((changed & ~over).sum())
+        over = now_over
+    elapsed = time.time() - start
+    return {"games_per_sec": num_games / elapsed,
+            "moves_per_sec": moves / elapsed,
+            "mean_score": float(total_score.mean())}
+
+
+# print benchmark_batch()
@@ -0,0 +1,257 @@
+"""
+Compact binary game records for 2048.
+
+A record file is a sequence of games appended one after the other. Each game is a fixed size header
+followed by one 3 byte event per step:
+    header: magic "G2", grid height, grid width, seed, number of events
+    event:  flags byte (direction in the low 3 bits, 0 for a tile placed without a move,
+            SPAWNED if a tile was placed, FOUR if that tile was a 4), then the flat
+            index of the new tile as a 16 bit integer
+The first events of a game are the starting tiles, so replaying all events from an empty grid gives
+back the exact game without storing any board. Replays keep a board every CHECKPOINT_EVENTS events,
+so seeking to a move only replays the events after the nearest checkpoint.
+"""
+
+import importlib
+import mmap
+import numbers
+import os
+import random
+import struct
+
+# game-2048.py cannot be imported with a plain import statement because of the dash
+game = importlib.import_module("game-2048")
+
+MAGIC = b"G2"
+HEADER = struct.Struct("<2sHHQI")
+EVENT = struct.Struct("<BH")
+
+NO_MOVE = 0
+DIRECTION_MASK = 0x7
+SPAWNED = 0x10
+FOUR = 0x20
+
+# a replay keeps the board after every this many events
+CHECKPOINT_EVENTS = 256
+
+
+class GameRecorder:
+    """
+    Play TwentyFortyEight games and append them to a record file.
+    """
+
+    def __init__(self, filename):
+        self.record_file = open(filename, "ab")
+        self.game = None
+        self.seed = 0
+        self.events = bytearray()
+        self.num_events = 0
+
+    def start_game(self, game_board, seed, start_tiles=2):
+        """
+        Seed random, reset the game and place its starting tiles.
+        The seed is stored in the header, so it must be an integer in 0..2 ** 64 - 1.
+        """
+        if not isinstance(seed, numbers.Integral) or not 0 <= seed < 1 << 64:
+            raise ValueError("seed must be an integer in 0..2 ** 64 - 1, got " + repr(seed))
+        random.seed(seed)
+        self.game = game_board
+        self.seed = seed
+        self.events = bytearray()
+        self.num_events = 0
+        self.game.reset()
+        for dummy in range(start_tiles):
+            self.game.last_tile = None
+            self.game.new_tile()
+            self.add_event(NO_MOVE)
+
+    def move(self, direction):
+        """
+        Move the game in the given direction and record the tile it placed, if any.
+        """
+        self.game.last_tile = None
+        self.game.move(direction)
+        self.add_event(direction)
+
+    def add_event(self, direction):
+        """
+        Pack the last tile placed by the game together with the move that caused it.
+        """
+        flags = direction
+        position = 0
+        if self.game.last_tile is not None:
+            row, col, value = self.game.last_tile
+            flags |= SPAWNED
+            if value == 4:
+                flags |= FOUR
+            position = row * self.game.get_grid_width() + col
+        self.events.extend(EVENT.pack(flags, position))
+        self.num_events += 1
+
+    def end_game(self):
+        """
+        Append the current game to the file.
+        """
+        self.record_file.write(HEADER.pack(MAGIC, self.game.get_grid_height(), self.game.get_grid_width(),
+                                           self.seed, self.num_events))
+        self.record_file.write(self.events)
+        self.record_file.flush()
+        self.game = None
+
+    def close(self):
+        """
+        Close the record file. A game that was not ended is dropped.
+        """
+        self.record_file.close()
+
+
+class GameArchive:
+    """
+    Read a record file through mmap. Only the game headers are read when opening;
+    events are decoded when they are asked for.
+    An empty file has no games. A game cut off at the end of the file (by a writer that
+    stopped half way) is left out, and truncated is set.
+    """
+
+    def __init__(self, filename):
+        self.record_file = open(filename, "rb")
+        # an empty file cannot be mapped
+        if os.fstat(self.record_file.fileno()).st_size == 0:
+            self.data = b""
+        else:
+            self.data = mmap.mmap(self.record_file.fileno(), 0, access=mmap.ACCESS_READ)
+        # (header offset, height, width, seed, number of events) of every game
+        self.index = []
+        self.truncated = False
+        offset = 0
+        while offset < len(self.data):
+            if offset + HEADER.size > len(self.data):
+                self.truncated = True
+                break
+            magic, height, width, seed, num_events = HEADER.unpack_from(self.data, offset)
+            if magic != MAGIC:
+                self.close()
+                raise ValueError("not a 2048 record at offset " + str(offset))
+            if offset + HEADER.size + num_events * EVENT.size > len(self.data):
+                self.truncated = True
+                break
+            self.index.append((offset, height, width, seed, num_events))
+            offset += HEADER.size + num_events * EVENT.size
+
+    def __len__(self):
+        return len(self.index)
+
+    def get_game(self, game_index):
+        """
+        Return a GameReplay for the game at game_index.
+        """
+        offset, height, width, seed, num_events = self.index[game_index]
+        return GameReplay(self.data, offset + HEADER.size, height, width, seed, num_events)
+
+    def iter_games(self):
+        """
+        Generate a GameReplay for every game in the file.
+        """
+        for game_index in range(len(self.index)):
+            yield self.get_game(game_index)
+
+    def close(self):
+        """
+        Release the mapping and the file.
+        """
+        if self.data:
+            self.data.close()
+        self.record_file.close()
+
+
+class GameReplay:
+    """
+    Lazy view of one recorded game.
+    """
+
+    def __init__(self, data, offset, height, width, seed, num_events):
+        self.data = data
+        self.offset = offset
+        self.height = height
+        self.width = width
+        self.seed = seed
+        self.num_events = num_events
+        # checkpoints[k] is the board after k * CHECKPOINT_EVENTS events
+        self.checkpoints = [(0,) * (height * width)]
+
+    def get_seed(self):
+        """
+        Return the seed the game was started with.
+        """
+        return self.seed
+
+    def __len__(self):
+        return self.num_events
+
+    def get_event(self, event_index):
+        """
+        Decode one event without touching the others.
+        Returns (direction, position, value) where direction is NO_MOVE for a starting tile,
+        and position and value are None if no tile was placed.
+        """
+        assert 0 <= event_index < self.num_events, "event index out of range"
+        flags, position = EVENT.unpack_from(self.data, self.offset + event_index * EVENT.size)
+        if not flags & SPAWNED:
+            return flags & DIRECTION_MASK, None, None
+        if flags & FOUR:
+            value = 4
+        else:
+            value = 2
+        return flags & DIRECTION_MASK, position, value
+
+    def iter_boards(self, stop=None):
+        """
+        Replay the first stop events (all of them if None), generating the flat row-major
+        board tuple after each one.
+        """
+        if stop is None:
+            stop = self.num_events
+        return self.replay(0, stop)
+
+    def replay(self, start, stop):
+        """
+        Generate the boards after events start..stop - 1, starting from the checkpoint at start,
+        which must be a multiple of CHECKPOINT_EVENTS already reached. Checkpoints passed on
+        the way are kept.
+        """
+        lines = game.get_line_indices(self.height, self.width)
+        board = self.checkpoints[start // CHECKPOINT_EVENTS]
+        for event_index in range(start, stop):
+            direction, position, value = self.get_event(event_index)
+            if direction != NO_MOVE:
+                board = game.slide_board(board, lines[direction])
+            if position is not None:
+                board = board[:position] + (value,) + board[position + 1:]
+            if (event_index + 1) % CHECKPOINT_EVENTS == 0 \
+                    and (event_index + 1) // CHECKPOINT_EVENTS == len(self.checkpoints):
+                self.checkpoints.append(board)
+            yield board
+
+    def board_at(self, event_index):
+        """
+        Return the flat board tuple after the first event_index events. Only the events after the
+        nearest checkpoint are decoded, so this is O(CHECKPOINT_EVENTS) once the checkpoints up
+        to event_index exist, and O(event_index) the first time.
+        """
+        checkpoint = min(event_index // CHECKPOINT_EVENTS, len(self.checkpoints) - 1)
+        board = self.checkpoints[checkpoint]
+        for board in self.replay(checkpoint * CHECKPOINT_EVENTS, event_index):
+            pass
+        return board
+
+
+# recorder = GameRecorder("games.bin")
+# for test_seed in range(10):
+#     recorder.start_game(game.TwentyFortyEight(4, 4), test_seed)
+#     for dummy_move in range(100):
+#         recorder.move(random.choice([game.UP, game.DOWN, game.LEFT, game.RIGHT]))
+#     recorder.end_game()
+# recorder.close()
+#
+# archive = GameArchive("games.bin")
+# print archive.get_game(3).board_at(50)
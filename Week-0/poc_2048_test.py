@@ -0,0 +1,117 @@
+"""
+Test suite for 2048.
+"""
+
+import importlib
+import random
+from testsuite import TestSuite
+
+# game-2048.py cannot be imported with a plain import statement because of the dash
+game = importlib.import_module("game-2048")
+
+def bitboard_from_tiles(tiles):
+    """
+    Build a TwentyFortyEightBitboard from a flat row-major list of tile values.
+    """
+    bitboard = game.TwentyFortyEightBitboard()
+    for idx in range(len(tiles)):
+        bitboard.set_tile(idx // 4, idx % 4, tiles[idx])
+    return bitboard
+
+def moved_grid(grid, direction):
+    """
+    Play one move on a TwentyFortyEight set to grid (a list of rows) and return the grid
+    after the move with the new tile taken out again, and the score of the move.
+    """
+    game_board = game.TwentyFortyEight(len(grid), len(grid[0]))
+    game_board.reset()
+    for row in range(len(grid)):
+        for col in range(len(grid[0])):
+            game_board.set_tile(row, col, grid[row][col])
+    game_board.last_tile = None
+    game_board.move(direction)
+    if game_board.last_tile is not None:
+        game_board.set_tile(game_board.last_tile[0], game_board.last_tile[1], 0)
+    return ([[game_board.get_tile(row, col) for col in range(len(grid[0]))] for row in range(len(grid))],
+            game_board.get_score())
+
+def run_test():
+    """
+    Run the test suite of 2048.
+    """
+
+    suite = TestSuite()
+
+    merge_cases = [([2, 0, 2, 4], [4, 4, 0, 0]), ([0, 0, 2, 2], [4, 0, 0, 0]),
+                   ([2, 2, 0, 0], [4, 0, 0, 0]), ([2, 2, 2, 2], [4, 4, 0, 0]),
+                   ([8, 16, 16, 8], [8, 32, 8, 0]), ([2, 4, 2, 4], [2, 4, 2, 4]),
+                   ([2, 0, 0, 0], [2, 0, 0, 0]), ([0, 2, 0, 0], [2, 0, 0, 0]),
+                   ([0, 0, 2, 0], [2, 0, 0, 0]), ([0, 0, 0, 2], [2, 0, 0, 0]),
+                   ([2, 0, 2, 2], [4, 2, 0, 0]), ([4, 4, 8], [8, 8, 0]), ([], [])]
+    for line, expected in merge_cases:
+        suite.run_test(game.merge(line), expected, "Test merge " + str(line))
+
+    suite.run_test(game.merge_with_score([2, 2, 4, 4]), ([4, 8, 0, 0], 12, True), \
+        "Test merge_with_score score")
+    suite.run_test(game.merge_with_score([2, 4, 8, 0]), ([2, 4, 8, 0], 0, False), \
+        "Test merge_with_score unchanged")
+    suite.run_test(game.merge_with_score([0, 2, 4, 8]), ([2, 4, 8, 0], 0, True), \
+        "Test merge_with_score slide without merge")
+    suite.run_test(game.merge_lines([2, 2, 0, 0, 4, 8, 0, 0, 0, 0, 0, 4], 4), \
+        ([4, 0, 0, 0, 4, 8, 0, 0, 4, 0, 0, 0], 4, [True, False, True]), "Test merge_lines")
+
+    grid = [[2, 2, 0, 4], [0, 4, 4, 0], [2, 0, 0, 2], [8, 8, 8, 8]]
+    suite.run_test(moved_grid(grid, game.LEFT), \
+        ([[4, 4, 0, 0], [8, 0, 0, 0], [4, 0, 0, 0], [16, 16, 0, 0]], 4 + 8 + 4 + 32), "Test move LEFT")
+    suite.run_test(moved_grid(grid, game.RIGHT), \
+        ([[0, 0, 4, 4], [0, 0, 0, 8], [0, 0, 0, 4], [0, 0, 16, 16]], 4 + 8 + 4 + 32), "Test move RIGHT")
+    suite.run_test(moved_grid(grid, game.UP), \
+        ([[4, 2, 4, 4], [8, 4, 8, 2], [0, 8, 0, 8], [0, 0, 0, 0]], 4), "Test move UP")
+    suite.run_test(moved_grid(grid, game.DOWN), \
+        ([[0, 0, 0, 0], [0, 2, 0, 4], [4, 4, 4, 2], [8, 8, 8, 8]], 4), "Test move DOWN")
+    suite.run_test(moved_grid([[2, 4], [8, 16], [32, 64]], game.LEFT), \
+        ([[2, 4], [8, 16], [32, 64]], 0), "Test move that changes nothing on a 3x2 grid")
+
+    # the bitboard slides like the flat boards of the expectimax player
+    random.seed(2048)
+    lines = game.get_line_indices(4, 4)
+    mismatches = 0
+    for dummy in range(2000):
+        tiles = tuple([random.choice([0, 0, 0, 2, 4, 8, 16, 16384]) for dummy_idx in range(16)])
+        bitboard = bitboard_from_tiles(tiles)
+        for direction in [game.UP, game.DOWN, game.LEFT, game.RIGHT]:
+            moved = game.TwentyFortyEightBitboard()
+            moved.board = game.move_board(bitboard.board, direction)
+            moved_tiles = tuple([moved.get_tile(idx // 4, idx % 4) for idx in range(16)])
+            if moved_tiles != game.slide_board(tiles, lines[direction]):
+                mismatches += 1
+    suite.run_test(mismatches, 0, "Test move_board matches slide_board")
+
+    bitboard = bitboard_from_tiles([2, 2, 4, 4] + [0] * 12)
+    bitboard.move(game.LEFT)
+    suite.run_test(bitboard.get_score(), 12, "Test bitboard get_score")
+
+    bitboard = bitboard_from_tiles([2, 4] * 2 + [4, 2] * 2 + [2, 4] * 2 + [4, 2] * 2)
+    suite.run_test((bitboard.is_full(), bitboard.can_move()), (True, False), \
+        "Test bitboard is_full and can_move on a stuck board")
+    bitboard.set_tile(3, 3, 4)
+    suite.run_test(bitboard.can_move(), True, "Test bitboard can_move with equal neighbours")
+
+    try:
+        bitboard.set_tile(0, 0, 65536)
+        overflow = False
+    except OverflowError:
+        overflow = True
+    suite.run_test((overflow, bitboard.get_tile(0, 1)), (True, 4), "Test bitboard rejects 65536")
+
+    bitboard = bitboard_from_tiles([32768, 32768] + [0] * 14)
+    try:
+        bitboard.move(game.RIGHT)
+        overflow = False
+    except OverflowError:
+        overflow = True
+    suite.run_test((overflow, bitboard.can_move()), (True, True), "Test bitboard merge above 32768")
+
+    suite.report_results()
+
+run_test()
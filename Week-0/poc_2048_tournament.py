@@ -0,0 +1,172 @@
+"""
+Headless 2048 strategy tournament, sharded over a process pool.
+
+A strategy is a module level function taking a TwentyFortyEight game and returning a direction,
+or None to give up. Every game is seeded from (seed, strategy name, game number), so the results
+do not depend on how many processes run them or in which order.
+"""
+
+import importlib
+import multiprocessing
+import random
+import time
+
+# game-2048.py cannot be imported with a plain import statement because of the dash
+game = importlib.import_module("game-2048")
+
+DIRECTIONS = [game.UP, game.DOWN, game.LEFT, game.RIGHT]
+# a game ends after this many moves in a row that do not change the board
+MAX_IDLE_MOVES = 50
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+
+def strategy_random(game_board):
+    """
+    Pick a random direction.
+    """
+    return random.choice(DIRECTIONS)
+
+
+def strategy_corner(game_board):
+    """
+    Keep the tiles in the top left corner: prefer UP and LEFT, then RIGHT, then DOWN.
+    """
+    board = tuple([game_board.get_tile(row, col) for row in range(game_board.get_grid_height())
+                   for col in range(game_board.get_grid_width())])
+    lines = game.get_line_indices(game_board.get_grid_height(), game_board.get_grid_width())
+    for direction in [game.UP, game.LEFT, game.RIGHT, game.DOWN]:
+        if game.slide_board(board, lines[direction]) != board:
+            return direction
+    return None
+
+
+def game_seed(seed, strategy_name, game_number):
+    """
+    Seed for one game, independent of the worker that plays it.
+    """
+    return "%d-%s-%d" % (seed, strategy_name, game_number)
+
+
+def play_game(task):
+    """
+    Play one game in a worker process
+    :param task: tuple of (strategy name, strategy, game number, seed, height, width, max moves)
+    :return: dictionary with the strategy name, game number, max tile, score and number of moves
+    """
+    strategy_name, strategy, game_number, seed, height, width, max_moves = task
+    random.seed(game_seed(seed, strategy_name, game_number))
+
+    game_board = game.TwentyFortyEight(height, width)
+    game_board.reset()
+    game_board.new_tile()
+    game_board.new_tile()
+
+    moves = 0
+    idle = 0
+    while moves < max_moves and idle < MAX_IDLE_MOVES and game_board.can_move():
+        direction = strategy(game_board)
+        if direction is None:
+            break
+        # new_tile() sets last_tile only when the move changed the board
+        game_board.last_tile = None
+        game_board.move(direction)
+        if game_board.last_tile is None:
+            idle += 1
+        else:
+            idle = 0
+            moves += 1
+
+    max_tile = max([game_board.get_tile(row, col) for row in range(height) for col in range(width)])
+    return {"strategy": strategy_name,
+            "game": game_number,
+            "max_tile": max_tile,
+            "score": game_board.get_score(),
+            "moves": moves}
+
+
+def iter_tournament(strategies, num_games, grid_height=4, grid_width=4, seed=0, processes=None,
+                    max_moves=100000):
+    """
+    Play num_games games with every strategy and generate each result as soon as it is done
+    :param strategies: dictionary of strategy name to strategy function
+    :param num_games: number of games per strategy
+    :param grid_height: height
+    :param grid_width: width
+    :param seed: base seed of the tournament
+    :param processes: number of worker processes, defaults to the number of cores
+    :param max_moves: cap on the number of moves in one game
+    :return: generator of play_game() results, in completion order
+    """
+    tasks = [(name, strategies[name], game_number, seed, grid_height, grid_width, max_moves)
+             for name in sorted(strategies) for game_number in range(num_games)]
+    pool = multiprocessing.Pool(processes)
+    try:
+        # small chunks keep results flowing back while still amortising the IPC
+        chunk_size = max(1, len(tasks) // (16 * (processes or multiprocessing.cpu_count())))
+        for result in pool.imap_unordered(play_game, tasks, chunk_size):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest rank percentile of an already sorted list.
+    """
+    rank = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[rank]
+
+
+def summarize(results):
+    """
+    Aggregate play_game() results
+    :param results: iterable of results
+    :return: dictionary of strategy name to {field: {percentile: value}} for max_tile, score and moves,
+             plus the number of games
+    """
+    values = {}
+    for result in results:
+        fields = values.setdefault(result["strategy"], {"max_tile": [], "score": [], "moves": []})
+        for field in fields:
+            fields[field].append(result[field])
+
+    summary = {}
+    for name, fields in values.items():
+        summary[name] = {"games": len(fields["moves"])}
+        for field, field_values in fields.items():
+            field_values.sort()
+            summary[name][field] = dict([(pct, percentile(field_values, pct)) for pct in PERCENTILES])
+    return summary
+
+
+def run_tournament(strategies, num_games, grid_height=4, grid_width=4, seed=0, processes=None):
+    """
+    Play a whole tournament and return its summary.
+    """
+    return summarize(iter_tournament(strategies, num_games, grid_height, grid_width, seed, processes))
+
+
+def benchmark_scaling(strategies, num_games=200, max_processes=None, seed=0):
+    """
+    time the same tournament with 1, 2, 4... worker processes
+    :param strategies: dictionary of strategy name to strategy function
+    :param num_games: number of games per strategy
+    :param max_processes: largest pool to try, defaults to the number of cores
+    :param seed: base seed
+    :return: list of (processes, games per second)
+    """
+    max_processes = max_processes or multiprocessing.cpu_count()
+    results = []
+    processes = 1
+    while processes <= max_processes:
+        start = time.time()
+        for dummy in iter_tournament(strategies, num_games, seed=seed, processes=processes):
+            pass
+        results.append((processes, num_games * len(strategies) / (time.time() - start)))
+        processes *= 2
+    return results
+
+
+# print run_tournament({"random": strategy_random, "corner": strategy_corner}, 1000)
+# print benchmark_scaling({"random": strategy_random, "corner": strategy_corner})
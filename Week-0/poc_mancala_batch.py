@@ -0,0 +1,102 @@
+"""
+Batch solvability check for Solitaire Mancala boards with NumPy.
+"""
+
+import time
+import numpy as np
+
+import mangala
+
+
+def evaluate_boards(boards):
+    """
+    Play every board with the same rule as SolitaireMancala.plan_moves (always sow the lowest legal
+    house) until no move is left.
+    boards is an (N, houses + 1) integer array in set_board() layout, store in column 0.
+    Returns (won, moves): a boolean array of boards that end with empty houses and the number of
+    moves played on each board.
+    """
+    work = np.array(boards, dtype=np.int64)
+    num_boards, num_cols = work.shape
+    won = np.zeros(num_boards, dtype=bool)
+    moves = np.zeros(num_boards, dtype=np.int64)
+    # the row of boards each working row came from
+    rows = np.arange(num_boards)
+    houses = np.arange(num_cols)
+
+    while len(rows) > 0:
+        legal = work == houses
+        legal[:, 0] = False
+        has_move = legal.any(axis=1)
+
+        # boards without a legal move are done, drop them from the working set
+        if not has_move.all():
+            done = ~has_move
+            won[rows[done]] = (work[done, 1:] == 0).all(axis=1)
+            work = work[has_move]
+            rows = rows[has_move]
+            legal = legal[has_move]
+            if len(rows) == 0:
+                break
+
+        # argmax gives the first True, which is the lowest legal house
+        house_num = legal.argmax(axis=1)
+        work += houses < house_num[:, np.newaxis]
+        work[np.arange(len(rows)), house_num] = 0
+        moves[rows] += 1
+
+    return won, moves
+
+
+def random_boards(num_boards, house_num, seed=0):
+    """
+    Random boards with up to house_num + 1 seeds in each house, store empty.
+    """
+    rng = np.random.RandomState(seed)
+    boards = rng.randint(0, house_num + 2, size=(num_boards, house_num + 1))
+    boards = np.minimum(boards, np.arange(house_num + 1) + 1)
+    boards[:, 0] = 0
+    return boards
+
+
+def mixed_boards(num_boards, house_num, seed=0):
+    """
+    num_boards boards in random order, half from random_boards() and half winnable boards from
+    mangala.WinnableBoardEnumerator, repeated as needed. Random boards nearly always stop after a
+    move or two, while winnable ones are sown until every house is empty.
+    """
+    enumerator = mangala.WinnableBoardEnumerator(house_num, house_num * (house_num + 1) // 2)
+    # the enumerator drops trailing empty houses
+    winnable = [board + [0] * (house_num + 1 - len(board)) for board in enumerator.gen_boards()]
+    num_winnable = num_boards // 2
+    boards = np.concatenate([np.array(winnable * (num_winnable // len(winnable) + 1))[:num_winnable],
+                             random_boards(num_boards - num_winnable, house_num, seed)])
+    return boards[np.random.RandomState(seed).permutation(num_boards)]
+
+
+def benchmark_batch(num_boards=100000, house_num=12, seed=0):
+    """
+    Boards per second of evaluate_boards() against a SolitaireMancala object per board, on
+    mixed_boards() so the sowing loop is exercised. The object loop only runs on the first
+    10000 boards. Also returns the mean number of moves played per board.
+    """
+    boards = mixed_boards(num_boards, house_num, seed)
+
+    start = time.time()
+    won, moves = evaluate_boards(boards)
+    batch_rate = num_boards / (time.time() - start)
+
+    loop_boards = boards[:10000].tolist()
+    start = time.time()
+    game = mangala.SolitaireMancala()
+    for board in loop_boards:
+        game.set_board(board)
+        for house in game.plan_moves():
+            game.apply_move(house)
+        game.is_game_won()
+    loop_rate = len(loop_boards) / (time.time() - start)
+
+    return {"batch": batch_rate, "loop": loop_rate, "won": float(won.mean()), "moves": float(moves.mean())}
+
+
+# print benchmark_batch()
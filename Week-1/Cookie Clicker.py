@@ -5,6 +5,12 @@ Cookie Clicker Simulator
 
 import simpleplot
 import math
+import time as clock
+import bisect
+import heapq
+import array
+import os
+import struct
 import poc_clicker_provided as provided
 # Used to increase the timeout, if necessary
 import codeskulptor
@@ -13,19 +19,139 @@ codeskulptor.set_timeout(20)
 # Constants
 SIM_TIME = 10000000000.0
 
+class ClickerHistory:
+    """
+    Compact history list for ClickerState.
+
+    Stores time, item id, cost and total cookies in four
+    typed arrays, with item names interned to small ids.
+    It reads like the usual list of
+    (time, item, cost of item, total cookies) tuples, but
+    tuples are only built when an entry is read.
+
+    With downsample = k only every k-th entry is kept (the
+    first one always is). With spill_file set, entries are
+    streamed to that file every spill_rows entries and
+    read back from it on demand. The spill file stays open
+    for those reads until close() is called, the history is
+    used as a context manager, or it is garbage collected.
+    """
+
+    _RECORD = struct.Struct("<dldd")
+
+    def __init__(self, downsample=1, spill_file=None, spill_rows=100000):
+        self._downsample = downsample
+        self._spill_rows = spill_rows
+        self._names = [None]
+        self._name_ids = {None: 0}
+        self._times = array.array("d")
+        self._item_ids = array.array("l")
+        self._costs = array.array("d")
+        self._totals = array.array("d")
+        self._seen = 0
+        self._spilled = 0
+        self._spill = None
+        if spill_file is not None:
+            self._spill = open(spill_file, "w+b")
+
+    def append(self, entry):
+        """
+        Add a (time, item, cost of item, total cookies) tuple
+        """
+        self._seen += 1
+        if (self._seen - 1) % self._downsample != 0:
+            return
+        name = entry[1]
+        if name not in self._name_ids:
+            self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        self._times.append(entry[0])
+        self._item_ids.append(self._name_ids[name])
+        self._costs.append(entry[2])
+        self._totals.append(entry[3])
+        if self._spill is not None and len(self._times) >= self._spill_rows:
+            self._spill_rows_out()
+
+    def _spill_rows_out(self):
+        """
+        Write the entries held in memory to the spill file
+        """
+        self._spill.seek(0, os.SEEK_END)
+        for idx in range(len(self._times)):
+            self._spill.write(self._RECORD.pack(self._times[idx], self._item_ids[idx],
+                                                self._costs[idx], self._totals[idx]))
+        self._spilled += len(self._times)
+        self._times = array.array("d")
+        self._item_ids = array.array("l")
+        self._costs = array.array("d")
+        self._totals = array.array("d")
+
+    def __len__(self):
+        return self._spilled + len(self._times)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[pos] for pos in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError("history index out of range")
+        if idx < self._spilled:
+            self._spill.seek(idx * self._RECORD.size)
+            time, item_id, cost, total = self._RECORD.unpack(self._spill.read(self._RECORD.size))
+            return (time, self._names[item_id], cost, total)
+        idx -= self._spilled
+        return (self._times[idx], self._names[self._item_ids[idx]], self._costs[idx], self._totals[idx])
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __eq__(self, other):
+        return len(self) == len(other) and all([mine == theirs for mine, theirs in zip(self, other)])
+
+    def __ne__(self, other):
+        return not self == other
+
+    def close(self):
+        """
+        Close the spill file, if any. Spilled entries cannot
+        be read after this
+        """
+        if self._spill is not None:
+            self._spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # the history usually outlives the simulation that
+        # filled it, so the spill file is closed with it
+        self.close()
+
 class ClickerState:
     """
     Simple class to keep track of the game state.
     """
     
-    def __init__(self):
+    def __init__(self, history=None):
+        """
+        history is an empty ClickerHistory to record into
+        instead of a plain list
+        """
         self._ttl_cookies = 0.0
         self._current_cookies = 0.0
         self._current_t = 0.0
         self._current_cps = 1.0
         self._item_name = None
         self._item_cost = 0.0
-        self._history_lst = [(self._current_t, self._item_name, self._item_cost, self._ttl_cookies)]
+        if history is None:
+            history = []
+        self._history_lst = history
+        self._history_lst.append((self._current_t, self._item_name, self._item_cost, self._ttl_cookies))
         
     def __str__(self):
         """
@@ -45,6 +171,14 @@ class ClickerState:
         """
         return self._current_cookies
     
+    def get_total_cookies(self):
+        """
+        Return total number of cookies made so far
+
+        Should return a float
+        """
+        return self._ttl_cookies
+
     def get_name(self):
         """
         Return current upgrade item name
@@ -120,16 +254,64 @@ class ClickerState:
             self._history_lst.append(his_tuple)
         else:
             pass
+
+    def fast_forward(self, item_name, build_info, duration, strategy=None):
+        """
+        Keep buying the same item for as long as it can be
+        bought before duration, with the same arithmetic as
+        time_until, wait and buy_item but without the method
+        calls. If strategy is given (one registered with
+        register_build_info_strategy), it is asked after every
+        purchase and the run stops when it picks another item
+
+        Returns the number of items bought
+        """
+        current_t = self._current_t
+        current_cookies = self._current_cookies
+        ttl_cookies = self._ttl_cookies
+        current_cps = self._current_cps
+        additional_cps = build_info.get_cps(item_name)
+        history = self._history_lst
+        bought = 0
+
+        while current_t <= duration:
+            if bought > 0 and strategy is not None and strategy(0.0, 0.0, 0.0, build_info) != item_name:
+                break
+            cost = build_info.get_cost(item_name)
+            if cost > 0 and cost >= current_cookies:
+                wait_time = math.ceil((cost - current_cookies) / current_cps)
+            else:
+                wait_time = 0.0
+            if wait_time > duration - current_t:
+                break
+            if wait_time > 0:
+                current_t += wait_time
+                current_cookies += current_cps * wait_time
+                ttl_cookies += current_cps * wait_time
+            if current_cookies >= cost:
+                current_cookies -= cost
+                current_cps += additional_cps
+                history.append((current_t, item_name, cost, ttl_cookies))
+                self._item_name = item_name
+                self._item_cost = cost
+                bought += 1
+            build_info.update_item(item_name)
+
+        self._current_t = current_t
+        self._current_cookies = current_cookies
+        self._ttl_cookies = ttl_cookies
+        self._current_cps = current_cps
+        return bought
    
     
-def simulate_clicker(build_info, duration, strategy):
+def simulate_clicker(build_info, duration, strategy, history=None):
     """
     Function to run a Cookie Clicker game for the given
     duration with the given strategy.  Returns a ClickerState
     object corresponding to game.
     """
     upgrade = build_info.clone()
-    action = ClickerState()
+    action = ClickerState(history)
 
     while action.get_time() <= duration:
         t_left = duration - action.get_time()
@@ -149,6 +331,45 @@ def simulate_clicker(build_info, duration, strategy):
     return action
 
 
+def simulate_clicker_fast(build_info, duration, strategy, history=None):
+    """
+    Same result as simulate_clicker, but strategies registered
+    with register_build_info_strategy buy each run of the same
+    item in one fast_forward call, and other strategies are
+    asked once per purchase instead of twice.
+    """
+    upgrade = build_info.clone()
+    action = ClickerState(history)
+
+    if strategy in BUILD_INFO_STRATEGIES:
+        while action.get_time() <= duration:
+            item_name = strategy(0.0, 0.0, 0.0, upgrade)
+            if item_name == None:
+                break
+            # a run cut short by the time left buys nothing when
+            # it is started again, which ends the game
+            if action.fast_forward(item_name, upgrade, duration, strategy) == 0:
+                break
+        action.wait(duration - action.get_time())
+        return action
+
+    while action.get_time() <= duration:
+        t_left = duration - action.get_time()
+        item_name = strategy(action.get_cookies(), action.get_cps(), t_left, upgrade)
+        if item_name == None:
+            break
+        cost = upgrade.get_cost(item_name)
+        wait_time = action.time_until(cost)
+        if wait_time > t_left:
+            break
+        action.wait(wait_time)
+        action.buy_item(item_name, cost, upgrade.get_cps(item_name))
+        upgrade.update_item(item_name)
+
+    action.wait(duration - action.get_time())
+    return action
+
+
 def strategy_cursor(cookies, cps, time_left, build_info):
     """
     Always pick Cursor!
@@ -169,6 +390,22 @@ def strategy_none(cookies, cps, time_left, build_info):
     """
     return None
 
+# Strategies whose pick depends on build_info alone
+BUILD_INFO_STRATEGIES = set()
+
+def register_build_info_strategy(strategy):
+    """
+    Let simulate_clicker_fast run the strategy's purchases
+    through fast_forward.
+
+    Only for strategies whose pick depends on build_info
+    alone, not on cookies, cps or time left: they are asked
+    with all three set to 0.0
+    """
+    BUILD_INFO_STRATEGIES.add(strategy)
+
+register_build_info_strategy(strategy_cursor)
+
 def strategy_cheap(cookies, cps, time_left, build_info):
     """
     Always return the cheapest item to upgrade
@@ -219,6 +456,315 @@ def strategy_best(cookies, cps, time_left, build_info):
     most_eff_idx = eff_lst.index(max(eff_lst))
     most_eff_item = item_lst[most_eff_idx] 
     return most_eff_item
+
+register_build_info_strategy(strategy_best)
+
+class BuildIndex:
+    """
+    Wrapper around a BuildInfo object that keeps its items
+    ordered by cost and by cps/cost efficiency, so the
+    indexed strategies below do not scan every item.
+
+    It has the same methods as BuildInfo, so it can be
+    passed to simulate_clicker in its place.
+    """
+
+    def __init__(self, build_info):
+        self._build_info = build_info
+        self._items = build_info.build_items()
+        # ties are broken by position in build_items(), like
+        # the list.index() calls in the plain strategies
+        self._position = {}
+        self._version = {}
+        self._cost_heap = []
+        self._eff_heap = []
+        self._cost_sorted = []
+        for position in range(len(self._items)):
+            item = self._items[position]
+            self._position[item] = position
+            self._version[item] = 0
+            self._push(item)
+
+    def _push(self, item):
+        """
+        Add the current entries of item to the heaps
+        and to the sorted cost list
+        """
+        cost = self._build_info.get_cost(item)
+        efficiency = self._build_info.get_cps(item) / cost
+        position = self._position[item]
+        version = self._version[item]
+        heapq.heappush(self._cost_heap, (cost, position, version, item))
+        heapq.heappush(self._eff_heap, (-efficiency, position, version, item))
+        bisect.insort(self._cost_sorted, (cost, -position, item))
+
+    def _top(self, heap):
+        """
+        Drop stale heap entries and return the top item
+        """
+        while heap[0][2] != self._version[heap[0][3]]:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def build_items(self):
+        """
+        Same as BuildInfo.build_items
+        """
+        return self._build_info.build_items()
+
+    def get_cost(self, item):
+        """
+        Same as BuildInfo.get_cost
+        """
+        return self._build_info.get_cost(item)
+
+    def get_cps(self, item):
+        """
+        Same as BuildInfo.get_cps
+        """
+        return self._build_info.get_cps(item)
+
+    def update_item(self, item):
+        """
+        Update the item in the BuildInfo object and
+        reindex it: O(log k) for the heaps, plus one
+        list insert/delete for the sorted costs
+        """
+        cost_entry = (self._build_info.get_cost(item), -self._position[item], item)
+        del self._cost_sorted[bisect.bisect_left(self._cost_sorted, cost_entry)]
+        self._build_info.update_item(item)
+        # old heap entries are left behind and skipped by _top
+        self._version[item] += 1
+        self._push(item)
+
+    def clone(self):
+        """
+        Return an index over a clone of the BuildInfo object
+        """
+        return BuildIndex(self._build_info.clone())
+
+    def cheapest(self):
+        """
+        Return (cost, item) of the cheapest item
+        """
+        entry = self._top(self._cost_heap)
+        return entry[0], entry[3]
+
+    def most_efficient(self):
+        """
+        Return the item with the greatest cps/cost
+        """
+        return self._top(self._eff_heap)[3]
+
+    def most_expensive(self, budget):
+        """
+        Return the most expensive item costing at most
+        budget, or None
+        """
+        idx = bisect.bisect_right(self._cost_sorted, (budget, float("inf")))
+        if idx == 0:
+            return None
+        return self._cost_sorted[idx - 1][2]
+
+def strategy_cheap_indexed(cookies, cps, time_left, build_index):
+    """
+    Same as strategy_cheap, for a BuildIndex
+    """
+    cost, item = build_index.cheapest()
+    if (cookies + cps * time_left) < cost:
+        return None
+    else:
+        return item
+
+def strategy_expensive_indexed(cookies, cps, time_left, build_index):
+    """
+    Same as strategy_expensive, for a BuildIndex
+    """
+    return build_index.most_expensive(cookies + (cps * time_left))
+
+def strategy_best_indexed(cookies, cps, time_left, build_index):
+    """
+    Same as strategy_best, for a BuildIndex
+    """
+    return build_index.most_efficient()
+
+def make_build_catalog(num_items):
+    """
+    Make a BuildInfo with num_items made up items, to try
+    the strategies on large catalogs
+    """
+    catalog = {}
+    for idx in range(num_items):
+        catalog["Item " + str(idx)] = [15.0 * 1.6 ** (idx % 40) + idx, 0.1 * 1.5 ** (idx % 40)]
+    return provided.BuildInfo(catalog)
+
+class ClickerSolver:
+    """
+    Branch-and-bound search for the purchase sequence that
+    gives the most total cookies after duration.
+
+    A node is (time, cookies, total cookies, cps, items
+    bought so far). Item costs only depend on how many of
+    each item were bought, so they are read once from a
+    clone of the BuildInfo object and cached.
+    """
+
+    def __init__(self, build_info, duration, time_bucket=1.0, max_nodes=1000000):
+        self._build_info = build_info.clone()
+        self._items = build_info.build_items()
+        self._cps = [build_info.get_cps(item) for item in self._items]
+        # _costs[idx][count] is the cost of item idx after count purchases
+        self._costs = [[build_info.get_cost(item)] for item in self._items]
+        self._duration = duration
+        self._time_bucket = time_bucket
+        self._max_nodes = max_nodes
+        self._memo = {}
+        self._best_total = 0.0
+        self._best_purchases = []
+        self.nodes = 0
+        self.pruned = 0
+        self.complete = True
+
+    def _cost(self, idx, count):
+        """
+        Cost of item idx after count purchases
+        """
+        costs = self._costs[idx]
+        while len(costs) <= count:
+            self._build_info.update_item(self._items[idx])
+            costs.append(self._build_info.get_cost(self._items[idx]))
+        return costs[count]
+
+    def _upper_bound(self, current_t, cookies, total, cps, counts):
+        """
+        Total cookies if every cookie could be turned into cps
+        the moment it is made, at the best cps/cost of any
+        item now. Costs never go down, so nothing can beat it
+        """
+        time_left = self._duration - current_t
+        best_eff = max([self._cps[idx] / self._cost(idx, counts[idx]) for idx in range(len(self._items))])
+        cps = cps + best_eff * cookies
+        if best_eff * time_left > 700.0:
+            return float("inf")
+        return total + cps * (math.exp(best_eff * time_left) - 1.0) / best_eff
+
+    def solve(self):
+        """
+        Run the search. Returns (total cookies, list of item
+        names in purchase order)
+
+        The depth first search keeps its own stack, as a long
+        game buys thousands of items, far past the recursion
+        limit. Each frame is [time, cookies, total cookies,
+        cps, items to try in order, next position in that
+        list, item bought to get there]
+        """
+        counts = [0] * len(self._items)
+        purchases = []
+        stack = []
+        order = self._visit(0.0, 0.0, 0.0, 1.0, counts, purchases)
+        if order is not None:
+            stack.append([0.0, 0.0, 0.0, 1.0, order, 0, None])
+
+        while stack and self.complete:
+            frame = stack[-1]
+            current_t, cookies, total, cps, order, position, dummy_idx = frame
+            if position == len(order):
+                stack.pop()
+                if frame[6] is not None:
+                    purchases.pop()
+                    counts[frame[6]] -= 1
+                continue
+            frame[5] += 1
+
+            idx = order[position]
+            cost = self._cost(idx, counts[idx])
+            if cost > 0 and cost >= cookies:
+                wait_time = math.ceil((cost - cookies) / cps)
+            else:
+                wait_time = 0.0
+            if wait_time > self._duration - current_t:
+                continue
+            counts[idx] += 1
+            purchases.append(self._items[idx])
+            child = (current_t + wait_time, cookies + cps * wait_time - cost,
+                     total + cps * wait_time, cps + self._cps[idx])
+            child_order = self._visit(child[0], child[1], child[2], child[3], counts, purchases)
+            if child_order is None:
+                purchases.pop()
+                counts[idx] -= 1
+            else:
+                stack.append([child[0], child[1], child[2], child[3], child_order, 0, idx])
+
+        return self._best_total, self._best_purchases
+
+    def _visit(self, current_t, cookies, total, cps, counts, purchases):
+        """
+        Count one node and record its total if it is the best
+        so far. Returns the items to try from it, most efficient
+        first, or None if it is cut off or the node budget is
+        used up
+        """
+        self.nodes += 1
+        if self.nodes > self._max_nodes:
+            self.complete = False
+            return None
+
+        # buying nothing more is always possible
+        final_total = total + cps * (self._duration - current_t)
+        if final_total > self._best_total:
+            self._best_total = final_total
+            self._best_purchases = list(purchases)
+
+        if self._upper_bound(current_t, cookies, total, cps, counts) <= self._best_total:
+            self.pruned += 1
+            return None
+
+        # same items bought in the same time bucket with no
+        # more cookies: no better than a node already searched.
+        # With 1 second buckets this is exact, as times are
+        # whole seconds and the money spent only depends on
+        # the items bought
+        key = (tuple(counts), int(current_t // self._time_bucket))
+        if self._memo.get(key, -1.0) >= cookies:
+            self.pruned += 1
+            return None
+        self._memo[key] = cookies
+
+        # try the most efficient items first, to find good
+        # totals early and prune more
+        return sorted(range(len(self._items)),
+                      key=lambda idx: -self._cps[idx] / self._cost(idx, counts[idx]))
+
+    def pruning_ratio(self):
+        """
+        Fraction of the nodes visited that were cut off
+        """
+        if self.nodes == 0:
+            return 0.0
+        return float(self.pruned) / self.nodes
+
+def time_indexed_strategies(num_items, time):
+    """
+    Time the plain strategies against the indexed ones
+    on a catalog of num_items items
+    """
+    results = {}
+    pairs = [("Cheap", strategy_cheap, strategy_cheap_indexed),
+             ("Expensive", strategy_expensive, strategy_expensive_indexed),
+             ("Best", strategy_best, strategy_best_indexed)]
+    for strategy_name, strategy, indexed_strategy in pairs:
+        start = clock.time()
+        state = simulate_clicker(make_build_catalog(num_items), time, strategy)
+        plain_time = clock.time() - start
+
+        start = clock.time()
+        indexed_state = simulate_clicker(BuildIndex(make_build_catalog(num_items)), time, indexed_strategy)
+        indexed_time = clock.time() - start
+
+        assert state.get_history() == indexed_state.get_history(), strategy_name + " histories differ"
+        results[strategy_name] = (plain_time, indexed_time)
+    return results
         
 def run_strategy(strategy_name, time, strategy):
     """
@@ -236,6 +782,23 @@ def run_strategy(strategy_name, time, strategy):
     # history = [(item[0], item[3]) for item in history]
     # simpleplot.plot_lines(strategy_name, 1000, 400, 'Time', 'Total Cookies', [history], True)
 
+def time_simulators(strategy, time):
+    """
+    Time simulate_clicker against simulate_clicker_fast
+    and check they end in the same state
+    """
+    start = clock.time()
+    state = simulate_clicker(provided.BuildInfo(), time, strategy)
+    step_time = clock.time() - start
+
+    start = clock.time()
+    fast_state = simulate_clicker_fast(provided.BuildInfo(), time, strategy)
+    fast_time = clock.time() - start
+
+    assert state.get_history() == fast_state.get_history(), "histories differ"
+    assert str(state) == str(fast_state), "final states differ"
+    return step_time, fast_time
+
 def run():
     """
     Run the simulator.
@@ -248,4 +811,13 @@ def run():
     run_strategy("Best", SIM_TIME, strategy_best)
     #run_strategy("None", SIM_TIME, strategy_none)
 
-run()
+    # print time_simulators(strategy_cursor, SIM_TIME)
+    # print time_simulators(strategy_best, SIM_TIME)
+    # print time_indexed_strategies(300, SIM_TIME)
+
+    # solver = ClickerSolver(provided.BuildInfo(), 10000.0)
+    # print solver.solve(), solver.nodes, solver.pruning_ratio()
+
+# only when run as a program, so the test and sweep modules can import the simulator
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,155 @@
+"""
+Cookie Clicker parameter sweeps, run over a process pool.
+
+Every simulation of a sweep is independent, so they are spread over
+worker processes and their results written to a column table as they
+come in. Strategies are passed to the workers by pickling, so they
+must be module level functions such as those of Cookie Clicker.py.
+"""
+
+import array
+import importlib
+import multiprocessing
+import os
+import time
+import poc_clicker_provided as provided
+
+# Cookie Clicker.py cannot be imported with a plain import statement because of the space
+clicker = importlib.import_module("Cookie Clicker")
+
+SWEEP_COLUMNS = [("build", None), ("strategy", None), ("duration", "d"),
+                 ("total_cookies", "d"), ("purchases", "l")]
+
+class ColumnWriter:
+    """
+    Append rows to a table stored one file per column in
+    a directory: numbers as raw typed arrays, strings as
+    one line each. Rows are buffered and flushed every
+    flush_rows rows, so a sweep can be read while it runs.
+    A new writer starts a new table, emptying any column
+    files already in the directory.
+    """
+
+    def __init__(self, directory, columns, flush_rows=1000):
+        """
+        columns is a list of (name, typecode) pairs, with
+        typecode an array module code or None for strings
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._directory = directory
+        self._columns = columns
+        self._flush_rows = flush_rows
+        self._buffer = [[] for dummy in columns]
+        self._rows = 0
+        for name, dummy_typecode in columns:
+            open(os.path.join(directory, name), "wb").close()
+
+    def add_row(self, row):
+        """
+        Buffer one row, given in column order
+        """
+        for idx in range(len(self._columns)):
+            self._buffer[idx].append(row[idx])
+        self._rows += 1
+        if self._rows % self._flush_rows == 0:
+            self.flush()
+
+    def flush(self):
+        """
+        Append the buffered rows to the column files
+        """
+        for idx in range(len(self._columns)):
+            name, typecode = self._columns[idx]
+            path = os.path.join(self._directory, name)
+            if typecode is None:
+                with open(path, "a") as column_file:
+                    for value in self._buffer[idx]:
+                        column_file.write(str(value) + "\n")
+            else:
+                with open(path, "ab") as column_file:
+                    array.array(typecode, self._buffer[idx]).tofile(column_file)
+            self._buffer[idx] = []
+
+def read_columns(directory, columns):
+    """
+    Read back a table written by ColumnWriter as a
+    dictionary of column name to list
+    """
+    table = {}
+    for name, typecode in columns:
+        path = os.path.join(directory, name)
+        if typecode is None:
+            with open(path) as column_file:
+                table[name] = column_file.read().splitlines()
+        else:
+            values = array.array(typecode)
+            with open(path, "rb") as column_file:
+                values.fromfile(column_file, os.path.getsize(path) // values.itemsize)
+            table[name] = values.tolist()
+    return table
+
+def run_sweep_task(task):
+    """
+    Run one simulation of a sweep in a worker process
+    """
+    build_name, build_dict, growth, duration, strategy_name, strategy = task
+    build_info = provided.BuildInfo(build_dict, growth)
+    state = clicker.simulate_clicker(build_info, duration, strategy)
+    # the first history entry is the starting state, not a purchase
+    purchases = len(state.get_history()) - 1
+    return (build_name, strategy_name, duration, state.get_total_cookies(), purchases)
+
+def sweep_clicker(build_configs, durations, strategies, directory, processes=None):
+    """
+    Run simulate_clicker for every build configuration,
+    duration and strategy on a process pool, writing each
+    result to a ColumnWriter table in directory as it
+    comes in.
+
+    build_configs maps a name to a (build dictionary,
+    growth factor) pair, as given to BuildInfo, and
+    strategies maps a name to a strategy function.
+    Returns the number of simulations run
+    """
+    tasks = []
+    for build_name in sorted(build_configs):
+        build_dict, growth = build_configs[build_name]
+        for duration in durations:
+            for strategy_name in sorted(strategies):
+                tasks.append((build_name, build_dict, growth, duration,
+                              strategy_name, strategies[strategy_name]))
+
+    writer = ColumnWriter(directory, SWEEP_COLUMNS)
+    pool = multiprocessing.Pool(processes)
+    try:
+        for row in pool.imap_unordered(run_sweep_task, tasks):
+            writer.add_row(row)
+    finally:
+        pool.terminate()
+        pool.join()
+        writer.flush()
+    return len(tasks)
+
+def benchmark_scaling(build_configs, durations, strategies, directory, max_processes=None):
+    """
+    Time the same sweep with 1, 2, 4... worker processes.
+    max_processes defaults to the number of cores.
+    Returns a list of (processes, simulations per second)
+    """
+    max_processes = max_processes or multiprocessing.cpu_count()
+    results = []
+    processes = 1
+    while processes <= max_processes:
+        start = time.time()
+        simulations = sweep_clicker(build_configs, durations, strategies, directory, processes)
+        results.append((processes, simulations / (time.time() - start)))
+        processes *= 2
+    return results
+
+
+# SWEEP_BUILDS = {"default": (None, 1.15), "steep": (None, 1.3)}
+# SWEEP_STRATEGIES = {"Cheap": clicker.strategy_cheap, "Expensive": clicker.strategy_expensive,
+#                     "Best": clicker.strategy_best}
+# print sweep_clicker(SWEEP_BUILDS, [1e4, 1e6, clicker.SIM_TIME], SWEEP_STRATEGIES, "sweep")
+# print benchmark_scaling(SWEEP_BUILDS, [1e4, 1e6, clicker.SIM_TIME], SWEEP_STRATEGIES, "sweep")
@@ -0,0 +1,58 @@
+"""
+Test suite for the Cookie Clicker simulator.
+"""
+
+import importlib
+import os
+import shutil
+import tempfile
+from poc_simpletest import TestSuite
+import poc_clicker_provided as provided
+import poc_clicker_sweep as sweep
+
+# Cookie Clicker.py cannot be imported with a plain import statement because of the space
+clicker = importlib.import_module("Cookie Clicker")
+
+def run_test():
+    """
+    Run the test suite of the Cookie Clicker simulator.
+    """
+
+    suite = TestSuite()
+
+    state = clicker.simulate_clicker(provided.BuildInfo(), clicker.SIM_TIME, clicker.strategy_best)
+    fast_state = clicker.simulate_clicker_fast(provided.BuildInfo(), clicker.SIM_TIME, clicker.strategy_best)
+    suite.run_test(fast_state.get_history() == state.get_history(), True, \
+        "Test #1: simulate_clicker_fast strategy_best history")
+    suite.run_test(str(fast_state), str(state), "Test #2: simulate_clicker_fast strategy_best state")
+
+    solver = clicker.ClickerSolver(provided.BuildInfo(), clicker.SIM_TIME, time_bucket=1000.0, max_nodes=20000)
+    total, purchases = solver.solve()
+    suite.run_test(solver.complete, False, "Test #3: ClickerSolver stops at the node cap")
+    suite.run_test(total >= state.get_total_cookies(), True, \
+        "Test #4: ClickerSolver at SIM_TIME does at least as well as strategy_best")
+    suite.run_test(len(purchases) > 1000, True, "Test #5: ClickerSolver goes deeper than the recursion limit")
+
+    directory = tempfile.mkdtemp()
+    for dummy in range(2):
+        writer = sweep.ColumnWriter(directory, sweep.SWEEP_COLUMNS)
+        writer.add_row(("default", "Best", 10000.0, 1.5, 3))
+        writer.flush()
+    table = sweep.read_columns(directory, sweep.SWEEP_COLUMNS)
+    suite.run_test(table["purchases"], [3], "Test #6: a new ColumnWriter starts an empty table")
+    shutil.rmtree(directory)
+
+    history = state.get_history()
+    directory = tempfile.mkdtemp()
+    with clicker.ClickerHistory(spill_file=os.path.join(directory, "spill"), spill_rows=100) as compact:
+        compact_state = clicker.simulate_clicker(provided.BuildInfo(), clicker.SIM_TIME, \
+            clicker.strategy_best, compact)
+        suite.run_test(compact_state.get_history()[1:300:7], history[1:300:7], \
+            "Test #7: ClickerHistory slices")
+        suite.run_test(compact[-3:], history[-3:], "Test #8: ClickerHistory negative slices")
+    suite.run_test(compact._spill.closed, True, "Test #9: ClickerHistory closes its spill file")
+    shutil.rmtree(directory)
+
+    suite.report_results()
+
+run_test()
@@ -0,0 +1,233 @@
+"""
+Monte Carlo Tree Search (UCT) Tic-Tac-Toe player.
+
+Unlike mc_move, which spreads its trials evenly over the moves and forgets
+them afterwards, the search grows a tree towards the promising moves and
+keeps the subtree of the position it reaches for the next call.
+"""
+
+import math
+import random
+import time
+
+import poc_ttt_provided as provided
+import poc_ttt_template as template
+
+# Exploration constant of the UCB1 formula
+UCT_C = math.sqrt(2)
+
+
+class MCTSNode(object):
+    """
+    One position of the search tree, reached by player playing move.
+    wins counts the playouts won by player (a draw counts half).
+    """
+    __slots__ = ("move", "player", "children", "untried", "wins", "visits")
+
+    def __init__(self, move, player, board):
+        self.move = move
+        self.player = player
+        self.children = []
+        if board.check_win() is None:
+            self.untried = board.get_empty_squares()
+            random.shuffle(self.untried)
+        else:
+            self.untried = []
+        self.wins = 0.0
+        self.visits = 0
+
+    def select_child(self):
+        """
+        Return the child with the highest UCB1 value.
+        """
+        log_visits = math.log(self.visits)
+        best_child = None
+        best_value = None
+        for child in self.children:
+            value = child.wins / child.visits + UCT_C * math.sqrt(log_visits / child.visits)
+            if best_child is None or value > best_value:
+                best_child = child
+                best_value = value
+        return best_child
+
+    def find_child(self, move):
+        """
+        Return the child reached by move, or None if it was not expanded.
+        """
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+
+class MCTSPlayer:
+    """
+    UCT player that keeps its tree between moves. After each move the
+    chosen child becomes the root, and on the next call the root is
+    moved down to the opponent's reply when that reply was expanded.
+    Asking again for the position just searched goes on with its tree.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.root_squares = None
+        self.searched = None
+        self.searched_squares = None
+        self.reused_visits = 0
+
+    def board_squares(self, board):
+        """
+        The squares of board as a flat tuple.
+        """
+        dim = board.get_dim()
+        return tuple([board.square(row, col) for row in range(dim) for col in range(dim)])
+
+    def find_root(self, board, player):
+        """
+        Return the node for board with player to move, from the kept
+        tree if board is the position searched last time, the kept
+        root or one opponent move away from it, else a new node.
+        """
+        squares = self.board_squares(board)
+        if self.root is not None and len(squares) == len(self.root_squares):
+            # a node is reached by the player who just moved, so player
+            # is to move at nodes whose player is the opponent: the
+            # searched position when the same move is asked again, and
+            # the kept root when one player object plays both sides
+            opponent = provided.switch_player(player)
+            for node, node_squares in [(self.searched, self.searched_squares),
+                                       (self.root, self.root_squares)]:
+                if node.player == opponent and squares == node_squares:
+                    return node
+            # otherwise the root is the position after our last move and
+            # board has the opponent's reply on one of its empty squares
+            changed = [idx for idx in range(len(squares)) if squares[idx] != self.root_squares[idx]]
+            if len(changed) == 1 and self.root.player == player \
+                    and self.root_squares[changed[0]] == provided.EMPTY \
+                    and squares[changed[0]] == opponent:
+                dim = board.get_dim()
+                node = self.root.find_child((changed[0] // dim, changed[0] % dim))
+                if node is not None:
+                    return node
+        return MCTSNode(None, provided.switch_player(player), board)
+
+    def get_move(self, board, player, trials):
+        """
+        Run trials select/expand/playout/update iterations from board
+        and return the most visited move as a (row, column) tuple.
+        """
+        root = self.find_root(board, player)
+        self.reused_visits = root.visits
+        for dummy in range(trials):
+            self.run_iteration(root, board)
+        if not root.children:
+            return None
+
+        best = max(root.children, key=lambda child: child.visits)
+        # keep the searched position for a repeated call and the
+        # subtree of the move for the next one
+        self.searched = root
+        self.searched_squares = self.board_squares(board)
+        self.root = best
+        board_clone = board.clone()
+        board_clone.move(best.move[0], best.move[1], best.player)
+        self.root_squares = self.board_squares(board_clone)
+        return best.move
+
+    def run_iteration(self, root, board):
+        """
+        One UCT iteration on a clone of board.
+        """
+        board_clone = board.clone()
+        node = root
+        path = [node]
+        # selection
+        while not node.untried and node.children:
+            node = node.select_child()
+            board_clone.move(node.move[0], node.move[1], node.player)
+            path.append(node)
+        # expansion
+        if node.untried:
+            move = node.untried.pop()
+            player = provided.switch_player(node.player)
+            board_clone.move(move[0], move[1], player)
+            child = MCTSNode(move, player, board_clone)
+            node.children.append(child)
+            node = child
+            path.append(node)
+        # playout
+        player = provided.switch_player(node.player)
+        empty = board_clone.get_empty_squares()
+        random.shuffle(empty)
+        for row, col in empty:
+            if board_clone.check_win() is not None:
+                break
+            board_clone.move(row, col, player)
+            player = provided.switch_player(player)
+        # update
+        winner = board_clone.check_win()
+        for path_node in path:
+            path_node.visits += 1
+            if winner == path_node.player:
+                path_node.wins += 1.0
+            elif winner == provided.DRAW:
+                path_node.wins += 0.5
+
+
+# Player used by mcts_move, so the tree is kept between calls
+MCTS_PLAYER = MCTSPlayer()
+
+def mcts_move(board, player, trials):
+    """
+    Same signature as mc_move, searching with MCTS_PLAYER.
+    """
+    return MCTS_PLAYER.get_move(board, player, trials)
+
+
+def play_match(move_x, trials_x, move_o, trials_o, dim=3, reverse=False):
+    """
+    Play one game without printing. Returns the winner and the seconds
+    spent by each player, as (winner, {PLAYERX: seconds, PLAYERO: seconds}).
+    """
+    board = provided.TTTBoard(dim, reverse)
+    players = {provided.PLAYERX: (move_x, trials_x), provided.PLAYERO: (move_o, trials_o)}
+    spent = {provided.PLAYERX: 0.0, provided.PLAYERO: 0.0}
+    player = provided.PLAYERX
+    while board.check_win() is None:
+        move_function, trials = players[player]
+        start = time.time()
+        row, col = move_function(board, player, trials)
+        spent[player] += time.time() - start
+        board.move(row, col, player)
+        player = provided.switch_player(player)
+    return board.check_win(), spent
+
+
+def benchmark_strength(dim=3, games=20, mcts_trials=200, mc_trials=1000, reverse=False):
+    """
+    Play mcts_move against mc_move, each starting half of the games.
+    Returns the wins of each side, the draws and the seconds each
+    side spent.
+    """
+    results = {"mcts": 0, "mc": 0, "draw": 0, "mcts_time": 0.0, "mc_time": 0.0}
+    for game in range(games):
+        if game % 2 == 0:
+            winner, spent = play_match(mcts_move, mcts_trials, template.mc_move_fast, mc_trials, dim, reverse)
+            mcts_player = provided.PLAYERX
+        else:
+            winner, spent = play_match(template.mc_move_fast, mc_trials, mcts_move, mcts_trials, dim, reverse)
+            mcts_player = provided.PLAYERO
+        if winner == provided.DRAW:
+            results["draw"] += 1
+        elif winner == mcts_player:
+            results["mcts"] += 1
+        else:
+            results["mc"] += 1
+        results["mcts_time"] += spent[mcts_player]
+        results["mc_time"] += spent[provided.switch_player(mcts_player)]
+    return results
+
+
+# provided.play_game(mcts_move, 1000, False)
+# print benchmark_strength()
+# print benchmark_strength(4, 10, 1000, 5000)
@@ -0,0 +1,101 @@
+"""
+Monte Carlo Tic-Tac-Toe playouts run as one NumPy batch.
+"""
+
+import numpy as np
+
+import poc_ttt_provided as provided
+import poc_ttt_template as template
+
+# Playouts are run in batches of at most this many trials to bound memory
+BATCH_TRIALS = 4096
+
+
+def line_indices(dim):
+    """
+    Return a (2 * dim + 2, dim) array with the flat square indices
+    of every row, column and diagonal.
+    """
+    lines = [[row * dim + col for col in range(dim)] for row in range(dim)]
+    lines += [[row * dim + col for row in range(dim)] for col in range(dim)]
+    lines.append([idx * dim + idx for idx in range(dim)])
+    lines.append([idx * dim + dim - idx - 1 for idx in range(dim)])
+    return np.array(lines)
+
+
+def scores_from_orders(board, player, orders):
+    """
+    Play one random game per row of orders and return the summed
+    mc_update_scores() grid as a flat array.
+    orders is a (trials, empties) array, each row a permutation of the
+    empty squares of board (flat indices) in the order they are played,
+    starting with player and alternating.
+    """
+    dim = board.get_dim()
+    num_squares = dim * dim
+    trials, num_empty = orders.shape
+    other = provided.switch_player(player)
+    start = np.array([board.square(idx // dim, idx % dim) for idx in range(num_squares)])
+
+    if board.check_win() is not None:
+        # mc_trial() stops at once, every trial scores the starting board
+        orders = orders[:, :0]
+        num_empty = 0
+        winner = np.full(trials, board.check_win())
+        end = np.full(trials, -1)
+    else:
+        winner = None
+
+    # owner and move number of every square in every trial, -1 for squares taken before
+    rows = np.arange(trials)[:, np.newaxis]
+    owner = np.tile(start, (trials, 1))
+    owner[rows, orders] = np.where(np.arange(num_empty) % 2 == 0, player, other)
+    move_time = np.full((trials, num_squares), -1)
+    move_time[rows, orders] = np.arange(num_empty)
+
+    if winner is None:
+        # a line is completed when its last square is played, if one player holds all of it
+        lines = line_indices(dim)
+        line_owner = owner[:, lines]
+        full = (line_owner == line_owner[:, :, :1]).all(axis=2) & (line_owner[:, :, 0] != provided.EMPTY)
+        done_at = np.where(full, move_time[:, lines].max(axis=2), num_empty)
+        first_line = done_at.argmin(axis=1)
+        end = done_at[np.arange(trials), first_line]
+        line_winner = line_owner[np.arange(trials), first_line, 0]
+        if board.is_reverse():
+            line_winner = np.where(line_winner == player, other, player)
+        winner = np.where(end < num_empty, line_winner, provided.DRAW)
+
+    # +1 for a machine win, -1 for a loss, 0 for a draw
+    sign = np.where(winner == player, 1.0, np.where(winner == provided.DRAW, 0.0, -1.0))
+    occupied = (owner != provided.EMPTY) & (move_time <= end[:, np.newaxis])
+    square_score = np.where(owner == player, template.MCMATCH, -template.MCOTHER) * occupied
+    return np.einsum("t,tn->n", sign, square_score)
+
+
+def mc_batch_scores(board, player, trials, rng=None):
+    """
+    Run trials random playouts and return the score grid mc_move would
+    build from them, as a list of lists.
+    """
+    if rng is None:
+        rng = np.random.RandomState()
+    dim = board.get_dim()
+    empty = np.array([row * dim + col for row, col in board.get_empty_squares()], dtype=np.int64)
+    scores = np.zeros(dim * dim)
+    for batch_start in range(0, trials, BATCH_TRIALS):
+        batch = min(BATCH_TRIALS, trials - batch_start)
+        # sorting random keys gives one uniform permutation per row
+        orders = empty[rng.random_sample((batch, len(empty))).argsort(axis=1)]
+        scores += scores_from_orders(board, player, orders)
+    return scores.reshape(dim, dim).tolist()
+
+
+def mc_move_numpy(board, player, trials):
+    """
+    Same as mc_move, with the playouts run by mc_batch_scores.
+    """
+    return template.get_best_move(board, mc_batch_scores(board, player, trials))
+
+
+# provided.play_game(mc_move_numpy, 10000, False)
@@ -0,0 +1,78 @@
+"""
+Monte Carlo Tic-Tac-Toe move with the trials run over a process pool.
+
+Kept apart from poc_ttt_template so the template stays importable where
+multiprocessing is not available.
+"""
+
+import multiprocessing
+import random
+import time
+
+import poc_ttt_provided as provided
+import poc_ttt_template as template
+
+# Trials are split into chunks of this size, each with its own seed,
+# so the result of mc_move_parallel does not depend on the number of workers
+CHUNK_TRIALS = 250
+
+
+def mc_chunk_scores(task):
+    """
+    Run one chunk of playouts in a worker process and return its
+    score grid.
+    """
+    board, player, trials, seed = task
+    random.seed(seed)
+    scores = [[0 for dummy in range(board.get_dim())] \
+        for dummy in range(board.get_dim())]
+    template.PlayoutKernel(board, player).run_trials(trials, scores)
+    return scores
+
+
+def mc_move_parallel(board, player, trials, seed=0, processes=None, pool=None):
+    """
+    Same as mc_move, with the trials split over a process pool.
+    Pass a pool to reuse it between moves, otherwise one with
+    processes workers is made for this move.
+    """
+    dim = board.get_dim()
+    tasks = []
+    for chunk in range(0, trials, CHUNK_TRIALS):
+        chunk_seed = "%s-%d-%d" % (seed, player, chunk)
+        tasks.append((board, player, min(CHUNK_TRIALS, trials - chunk), chunk_seed))
+
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes)
+    try:
+        # imap keeps chunk order, so the sums are always done in the same order
+        scores = [[0 for dummy in range(dim)] for dummy in range(dim)]
+        for chunk_scores in pool.imap(mc_chunk_scores, tasks):
+            for row in range(dim):
+                for col in range(dim):
+                    scores[row][col] += chunk_scores[row][col]
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+    return template.get_best_move(board, scores)
+
+
+def benchmark_trials(dim=3, trials=10000):
+    """
+    Trials per second of mc_move_fast and mc_move_parallel on an
+    empty board.
+    """
+    board = provided.TTTBoard(dim)
+    results = {}
+    for name, move_function in [("mc_move_fast", template.mc_move_fast),
+                                ("mc_move_parallel", mc_move_parallel)]:
+        start = time.time()
+        move_function(board, provided.PLAYERX, trials)
+        results[name] = trials / (time.time() - start)
+    return results
+
+
+# print benchmark_trials()
+# print benchmark_trials(5, 20000)
@@ -29,6 +29,49 @@ class TTTBoard:
             # Copy board grid
             self._board = [[board[row][col] for col in range(dim)] 
                            for row in range(dim)]
+
+        # Per-line counters: for each player, how many squares of each
+        # row (0..dim-1), column (dim..2dim-1) and diagonal (2dim, 2dim+1)
+        # it holds, so move() can spot a completed line in O(1)
+        self._line_counts = {PLAYERX: [0] * (2 * dim + 2),
+                             PLAYERO: [0] * (2 * dim + 2)}
+        self._num_empty = dim * dim
+        self._winner = None
+        for row in range(dim):
+            for col in range(dim):
+                if self._board[row][col] != EMPTY:
+                    self._count_square(row, col, self._board[row][col])
+        # a copied grid may already hold a line, find it in the
+        # same order the full scan did: rows, columns, diagonals
+        for player_counts in zip(self._line_counts[PLAYERX], self._line_counts[PLAYERO]):
+            if dim in player_counts:
+                self._winner = PLAYERX if player_counts[0] == dim else PLAYERO
+                break
+
+    def _line_ids(self, row, col):
+        """
+        Return the indices of the lines through (row, col).
+        """
+        lines = [row, self._dim + col]
+        if row == col:
+            lines.append(2 * self._dim)
+        if row + col == self._dim - 1:
+            lines.append(2 * self._dim + 1)
+        return lines
+
+    def _count_square(self, row, col, player):
+        """
+        Update the counters for player taking (row, col).
+        Returns True if that completes a line.
+        """
+        self._num_empty -= 1
+        counts = self._line_counts[player]
+        completed = False
+        for line in self._line_ids(row, col):
+            counts[line] += 1
+            if counts[line] == self._dim:
+                completed = True
+        return completed
             
     def __str__(self):
         """
@@ -52,6 +95,13 @@ class TTTBoard:
         Return the dimension of the board.
         """
         return self._dim
+
+    def is_reverse(self):
+        """
+        Return True if the board is in reverse mode, where
+        completing a line loses the game.
+        """
+        return self._reverse
     
     def square(self, row, col):
         """
@@ -79,6 +129,8 @@ class TTTBoard:
         """
         if self._board[row][col] == EMPTY:
             self._board[row][col] = player
+            if self._count_square(row, col, player) and self._winner == None:
+                self._winner = player
 
     def check_win(self):
         """
@@ -86,33 +138,14 @@ class TTTBoard:
         If game is a draw, return DRAW.
         If game is in progress, return None.
         """
-        lines = []
-
-        # rows
-        lines.extend(self._board)
-
-        # cols
-        cols = [[self._board[rowidx][colidx] for rowidx in range(self._dim)]
-                for colidx in range(self._dim)]
-        lines.extend(cols)
-
-        # diags
-        diag1 = [self._board[idx][idx] for idx in range(self._dim)]
-        diag2 = [self._board[idx][self._dim - idx -1] 
-                 for idx in range(self._dim)]
-        lines.append(diag1)
-        lines.append(diag2)
-
-        # check all lines
-        for line in lines:
-            if len(set(line)) == 1 and line[0] != EMPTY:
-                if self._reverse:
-                    return switch_player(line[0])
-                else:
-                    return line[0]
+        if self._winner != None:
+            if self._reverse:
+                return switch_player(self._winner)
+            else:
+                return self._winner
 
         # no winner, check for draw
-        if len(self.get_empty_squares()) == 0:
+        if self._num_empty == 0:
             return DRAW
 
         # game is still in progress
@@ -124,6 +157,132 @@ class TTTBoard:
         """
         return TTTBoard(self._dim, self._reverse, self._board)
 
+# Line masks for TTTBitBoard, by dimension
+BIT_LINES = {}
+
+def get_bit_lines(dim):
+    """
+    Return the bit masks of every row, column and diagonal
+    of a dim x dim board, square (row, col) being bit
+    row * dim + col.
+    """
+    if dim not in BIT_LINES:
+        lines = []
+        for row in range(dim):
+            lines.append(sum([1 << (row * dim + col) for col in range(dim)]))
+        for col in range(dim):
+            lines.append(sum([1 << (row * dim + col) for row in range(dim)]))
+        lines.append(sum([1 << (idx * dim + idx) for idx in range(dim)]))
+        lines.append(sum([1 << (idx * dim + dim - idx - 1) for idx in range(dim)]))
+        BIT_LINES[dim] = lines
+    return BIT_LINES[dim]
+
+class TTTBitBoard:
+    """
+    Same interface as TTTBoard for boards up to 8x8, with
+    each player's squares stored as the bits of one integer.
+    """
+
+    def __init__(self, dim, reverse = False, board = None):
+        assert dim <= 8, "TTTBitBoard supports boards up to 8x8"
+        self._dim = dim
+        self._reverse = reverse
+        self._lines = get_bit_lines(dim)
+        self._full = (1 << (dim * dim)) - 1
+        self._bits = {PLAYERX: 0, PLAYERO: 0}
+        if board != None:
+            for row in range(dim):
+                for col in range(dim):
+                    if board[row][col] != EMPTY:
+                        self._bits[board[row][col]] |= 1 << (row * dim + col)
+
+    def __str__(self):
+        """
+        Human readable representation of the board.
+        """
+        grid = [[self.square(row, col) for col in range(self._dim)]
+                for row in range(self._dim)]
+        return str(TTTBoard(self._dim, self._reverse, grid))
+
+    def get_dim(self):
+        """
+        Return the dimension of the board.
+        """
+        return self._dim
+
+    def is_reverse(self):
+        """
+        Return True if the board is in reverse mode, where
+        completing a line loses the game.
+        """
+        return self._reverse
+
+    def square(self, row, col):
+        """
+        Return the status (EMPTY, PLAYERX, PLAYERO) of the square at
+        position (row, col).
+        """
+        bit = 1 << (row * self._dim + col)
+        if self._bits[PLAYERX] & bit:
+            return PLAYERX
+        if self._bits[PLAYERO] & bit:
+            return PLAYERO
+        return EMPTY
+
+    def get_empty_squares(self):
+        """
+        Return a list of (row, col) tuples for all empty squares
+        """
+        empty_bits = self._full & ~(self._bits[PLAYERX] | self._bits[PLAYERO])
+        empty = []
+        while empty_bits:
+            low_bit = empty_bits & -empty_bits
+            idx = low_bit.bit_length() - 1
+            empty.append((idx // self._dim, idx % self._dim))
+            empty_bits ^= low_bit
+        return empty
+
+    def move(self, row, col, player):
+        """
+        Place player on the board at position (row, col).
+
+        Does nothing if board square is not empty.
+        """
+        bit = 1 << (row * self._dim + col)
+        if not (self._bits[PLAYERX] | self._bits[PLAYERO]) & bit:
+            self._bits[player] |= bit
+
+    def check_win(self):
+        """
+        If someone has won, return player.
+        If game is a draw, return DRAW.
+        If game is in progress, return None.
+        """
+        bits_x = self._bits[PLAYERX]
+        bits_o = self._bits[PLAYERO]
+        for line in self._lines:
+            if bits_x & line == line:
+                winner = PLAYERX
+            elif bits_o & line == line:
+                winner = PLAYERO
+            else:
+                continue
+            if self._reverse:
+                return switch_player(winner)
+            return winner
+
+        if bits_x | bits_o == self._full:
+            return DRAW
+        return None
+
+    def clone(self):
+        """
+        Return a copy of the board.
+        """
+        board = TTTBitBoard(self._dim, self._reverse)
+        board._bits = {PLAYERX: self._bits[PLAYERX], PLAYERO: self._bits[PLAYERO]}
+        return board
+
 def switch_player(player):
     """
     Convenience function to switch players.
@@ -3,6 +3,7 @@ Monte Carlo Tic-Tac-Toe Player
 """
 
 import random
+import time
 # import poc_ttt_gui
 import poc_ttt_provided as provided
 
@@ -92,6 +93,243 @@ def mc_move(board, player, trials):
         mc_update_scores(scores, board_clone, player)
     return get_best_move(board, scores)
 
+class PlayoutKernel:
+    """
+    Runs mc_trial style random playouts from one board without
+    cloning it. The board is copied once into a flat list, every
+    trial shuffles the empty squares once and plays them in that
+    order, and wins are found from per-line counters updated after
+    each move. The flat list and counters are reset from a snapshot.
+    """
+
+    def __init__(self, board, player):
+        self.dim = board.get_dim()
+        self.player = player
+        self.reverse_mode = board.is_reverse()
+        dim = self.dim
+
+        # lines[idx] lists the squares of a row, column or diagonal
+        lines = [[row * dim + col for col in range(dim)] for row in range(dim)]
+        lines += [[row * dim + col for row in range(dim)] for col in range(dim)]
+        lines.append([idx * dim + idx for idx in range(dim)])
+        lines.append([idx * dim + dim - idx - 1 for idx in range(dim)])
+        self.square_lines = [[] for dummy in range(dim * dim)]
+        for line_idx in range(len(lines)):
+            for square in lines[line_idx]:
+                self.square_lines[square].append(line_idx)
+
+        self.start = [board.square(idx // dim, idx % dim) for idx in range(dim * dim)]
+        self.empty = [idx for idx in range(dim * dim) if self.start[idx] == provided.EMPTY]
+        self.start_counts = {provided.PLAYERX: [0] * len(lines), provided.PLAYERO: [0] * len(lines)}
+        for idx in range(dim * dim):
+            if self.start[idx] != provided.EMPTY:
+                for line_idx in self.square_lines[idx]:
+                    self.start_counts[self.start[idx]][line_idx] += 1
+        self.start_winner = board.check_win()
+
+        self.cells = list(self.start)
+        self.counts = {provided.PLAYERX: list(self.start_counts[provided.PLAYERX]),
+                       provided.PLAYERO: list(self.start_counts[provided.PLAYERO])}
+        self.order = list(self.empty)
+
+    def run_trial(self):
+        """
+        Play one random game from the snapshot. Returns the winner as
+        check_win() would and the number of squares of self.order
+        that were played.
+        """
+        if self.start_winner is not None:
+            return self.start_winner, 0
+        self.cells[:] = self.start
+        counts_x = self.counts[provided.PLAYERX]
+        counts_o = self.counts[provided.PLAYERO]
+        counts_x[:] = self.start_counts[provided.PLAYERX]
+        counts_o[:] = self.start_counts[provided.PLAYERO]
+        random.shuffle(self.order)
+
+        player = self.player
+        dim = self.dim
+        for played in range(len(self.order)):
+            square = self.order[played]
+            self.cells[square] = player
+            counts = self.counts[player]
+            for line_idx in self.square_lines[square]:
+                counts[line_idx] += 1
+                if counts[line_idx] == dim:
+                    return self.winner(player), played + 1
+            player = provided.switch_player(player)
+        return provided.DRAW, len(self.order)
+
+    def winner(self, player):
+        """
+        The player check_win() reports when player completes a line.
+        """
+        if self.reverse_mode:
+            return provided.switch_player(player)
+        return player
+
+    def run_trials(self, trials, scores):
+        """
+        Run trials playouts and add their mc_update_scores()
+        scores into the scores grid.
+        """
+        dim = self.dim
+        wins = 0
+        losses = 0
+        for dummy in range(trials):
+            winner, played = self.run_trial()
+            if winner == provided.DRAW:
+                continue
+            machine_win = winner == self.player
+            if machine_win:
+                wins += 1
+            else:
+                losses += 1
+            for square in self.order[:played]:
+                if (self.cells[square] == self.player) == machine_win:
+                    scores[square // dim][square % dim] += MCMATCH if machine_win else MCOTHER
+                else:
+                    scores[square // dim][square % dim] -= MCOTHER if machine_win else MCMATCH
+
+        # squares taken before the trials get the same score every time
+        for idx in range(dim * dim):
+            if self.start[idx] == self.player:
+                scores[idx // dim][idx % dim] += MCMATCH * (wins - losses)
+            elif self.start[idx] != provided.EMPTY:
+                scores[idx // dim][idx % dim] += MCOTHER * (losses - wins)
+
+def mc_move_fast(board, player, trials):
+    """
+    Same as mc_move, with the playouts run by a PlayoutKernel.
+    """
+    scores = [[0 for dummy in range(board.get_dim())] \
+        for dummy in range(board.get_dim())]
+    PlayoutKernel(board, player).run_trials(trials, scores)
+    return get_best_move(board, scores)
+
+# Playouts run between two looks at the clock in AnytimeMCPlayer
+TIMED_CHUNK_TRIALS = 50
+
+class AnytimeMCPlayer:
+    """
+    mc_move with a time budget instead of a trial count. Playouts
+    are run in chunks by a PlayoutKernel until the budget is used,
+    and the stats of the last move are kept for get_stats().
+    """
+
+    def __init__(self, chunk_trials=TIMED_CHUNK_TRIALS):
+        self.chunk_trials = chunk_trials
+        self.stats = {}
+
+    def get_move(self, board, player, time_budget):
+        """
+        Run playouts for time_budget seconds (at least one chunk)
+        and return get_best_move() of the scores so far.
+        """
+        dim = board.get_dim()
+        deadline = time.time() + time_budget
+        start = time.time()
+        kernel = PlayoutKernel(board, player)
+        scores = [[0 for dummy in range(dim)] for dummy in range(dim)]
+        empty = board.get_empty_squares()
+
+        trials = 0
+        best_move = None
+        stable_since = 0
+        # (trials, largest change of any empty square's mean score) after each chunk
+        convergence = []
+        means = None
+        while trials == 0 or time.time() < deadline:
+            kernel.run_trials(self.chunk_trials, scores)
+            trials += self.chunk_trials
+            new_means = [float(scores[row][col]) / trials for row, col in empty]
+            if means is not None:
+                convergence.append((trials, max([abs(new_means[idx] - means[idx])
+                                                 for idx in range(len(empty))] or [0.0])))
+            means = new_means
+            move = get_best_move(board, scores)
+            if move != best_move:
+                best_move = move
+                stable_since = trials
+
+        elapsed = time.time() - start
+        self.stats = {"trials": trials,
+                      "elapsed": elapsed,
+                      "playouts_per_sec": trials / elapsed if elapsed > 0 else 0.0,
+                      "convergence": convergence,
+                      "best_move_stable_since": stable_since}
+        return best_move
+
+    def get_stats(self):
+        """
+        Return the stats of the last get_move() call: trials completed,
+        seconds used, playouts per second, the convergence list and
+        the trial count since which the best move has not changed.
+        """
+        return self.stats
+
+# Player used by mc_move_timed, so its stats can be read after a move
+ANYTIME_PLAYER = AnytimeMCPlayer()
+
+def mc_move_timed(board, player, time_budget):
+    """
+    Same as mc_move, with a budget in seconds in place of the number
+    of trials. Stats are in ANYTIME_PLAYER.get_stats().
+    """
+    return ANYTIME_PLAYER.get_move(board, player, time_budget)
+
+def benchmark_budget(dims=(3, 4, 5, 6), time_budget=0.1):
+    """
+    Playouts per second mc_move_timed reaches on an empty board of
+    each dimension, to size budgets per board dimension.
+    """
+    results = {}
+    for dim in dims:
+        mc_move_timed(provided.TTTBoard(dim), provided.PLAYERX, time_budget)
+        stats = ANYTIME_PLAYER.get_stats()
+        results[dim] = (stats["trials"], stats["playouts_per_sec"])
+    return results
+
+def benchmark_trials(dim=3, trials=10000):
+    """
+    Trials per second of mc_move and mc_move_fast on an empty
+    board.
+    """
+    board = provided.TTTBoard(dim)
+    results = {}
+    for name, move_function in [("mc_move", mc_move), ("mc_move_fast", mc_move_fast)]:
+        start = time.time()
+        move_function(board, provided.PLAYERX, trials)
+        results[name] = trials / (time.time() - start)
+    return results
+
+def count_nodes(board, player, depth):
+    """
+    Visit every position up to depth moves ahead, cloning the
+    board at each node like mm_move does. Returns the number
+    of nodes visited.
+    """
+    if depth == 0 or board.check_win() != None:
+        return 1
+    nodes = 1
+    for row, col in board.get_empty_squares():
+        child = board.clone()
+        child.move(row, col, player)
+        nodes += count_nodes(child, provided.switch_player(player), depth - 1)
+    return nodes
+
+def benchmark_boards(dim=4, depth=4):
+    """
+    Nodes per second of count_nodes with TTTBoard and
+    TTTBitBoard.
+    """
+    results = {}
+    for name, board_class in [("TTTBoard", provided.TTTBoard), ("TTTBitBoard", provided.TTTBitBoard)]:
+        start = time.time()
+        nodes = count_nodes(board_class(dim), provided.PLAYERX, depth)
+        results[name] = nodes / (time.time() - start)
+    return results
+
 # Test game with the console or the GUI.
 # Uncomment whichever you prefer.
 # Both should be commented out when you submit for
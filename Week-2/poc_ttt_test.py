@@ -2,9 +2,14 @@
 Test suite for Tic-Tac-Toe.
 """
 
+import itertools
+import numpy as np
 from poc_simpletest import TestSuite
 import poc_ttt_template as tic_tac_toe
 import poc_ttt_provided as provided
+import poc_ttt_mcts
+import poc_ttt_numpy
+import poc_ttt_parallel
 
 def run_test():
     """
@@ -44,6 +49,110 @@ def run_test():
     print board
     print mc_move(board, provided.PLAYERX, tic_tac_toe.NTRIALS)
 
+    # one kernel trial scores like mc_update_scores on the game its order plays out
+    mismatches = 0
+    for reverse in [False, True]:
+        kernel_board = provided.TTTBoard(3, reverse, \
+            [[board.square(row, col) for col in range(3)] for row in range(3)])
+        kernel = tic_tac_toe.PlayoutKernel(kernel_board, provided.PLAYERX)
+        for dummy in range(50):
+            kernel_scores = [[0 for dummy_col in range(3)] for dummy_row in range(3)]
+            kernel.run_trials(1, kernel_scores)
+            board_clone = kernel_board.clone()
+            player = provided.PLAYERX
+            for square in kernel.order:
+                if board_clone.check_win() != None:
+                    break
+                board_clone.move(square // 3, square % 3, player)
+                player = provided.switch_player(player)
+            trial_scores = [[0 for dummy_col in range(3)] for dummy_row in range(3)]
+            mc_update_scores(trial_scores, board_clone, provided.PLAYERX)
+            if kernel_scores != trial_scores:
+                mismatches += 1
+    suite.run_test(mismatches, 0, "Test #2: PlayoutKernel.run_trials scores like mc_update_scores")
+
+    parallel_move = poc_ttt_parallel.mc_move_parallel(board, provided.PLAYERX, 1000, 1, 1)
+    suite.run_test(poc_ttt_parallel.mc_move_parallel(board, provided.PLAYERX, 1000, 1, 2), \
+        parallel_move, "Test #3: mc_move_parallel is reproducible")
+
+    board = provided.TTTBoard(4, True)
+    for col in range(3):
+        board.move(1, col, provided.PLAYERO)
+    board_clone = board.clone()
+    suite.run_test(board_clone.check_win(), None, "Test #4: check_win in progress")
+    board_clone.move(1, 3, provided.PLAYERO)
+    suite.run_test(board_clone.check_win(), provided.PLAYERX, \
+        "Test #5: check_win reverse mode after clone")
+    suite.run_test(board.check_win(), None, "Test #6: clone does not share counters")
+
+    bit_board = provided.TTTBitBoard(4, True)
+    for col in range(3):
+        bit_board.move(1, col, provided.PLAYERO)
+    bit_clone = bit_board.clone()
+    bit_clone.move(1, 3, provided.PLAYERO)
+    suite.run_test((bit_board.check_win(), bit_clone.check_win()), \
+        (None, provided.PLAYERX), "Test #7: TTTBitBoard check_win")
+    suite.run_test(bit_board.get_empty_squares(), board.get_empty_squares(), \
+        "Test #8: TTTBitBoard get_empty_squares")
+
+    board = provided.TTTBoard(3, False, \
+        [[provided.PLAYERX, provided.PLAYERX, provided.EMPTY], \
+        [provided.PLAYERO, provided.PLAYERO, provided.EMPTY], \
+        [provided.EMPTY, provided.EMPTY, provided.EMPTY]])
+    suite.run_test(poc_ttt_mcts.MCTSPlayer().get_move(board, provided.PLAYERX, 500), \
+        (0, 2), "Test #9: MCTS takes the winning square")
+
+    mcts_player = poc_ttt_mcts.MCTSPlayer()
+    mcts_board = provided.TTTBoard(3)
+    row, col = mcts_player.get_move(mcts_board, provided.PLAYERX, 2000)
+    mcts_board.move(row, col, provided.PLAYERX)
+    reply = mcts_player.root.children[0].move
+    mcts_board.move(reply[0], reply[1], provided.PLAYERO)
+    mcts_player.get_move(mcts_board, provided.PLAYERX, 100)
+    suite.run_test(mcts_player.reused_visits > 0, True, \
+        "Test #10: MCTS reuses the subtree of the reply")
+
+    suite.run_test(tic_tac_toe.mc_move_timed(board, provided.PLAYERX, 0.05), \
+        (0, 2), "Test #11: mc_move_timed")
+    suite.run_test(tic_tac_toe.ANYTIME_PLAYER.get_stats()["trials"] > 0, True, \
+        "Test #12: mc_move_timed stats")
+
+    # every order of the empty squares, replayed with TTTBoard, scores like the numpy batch
+    for reverse in [False, True]:
+        order_board = provided.TTTBoard(3, reverse, \
+            [[provided.PLAYERX, provided.EMPTY, provided.EMPTY], \
+            [provided.PLAYERO, provided.PLAYERO, provided.EMPTY], \
+            [provided.EMPTY, provided.PLAYERX, provided.EMPTY]])
+        empty = [row * 3 + col for row, col in order_board.get_empty_squares()]
+        orders = list(itertools.permutations(empty))
+        order_scores = [[0.0 for dummy_col in range(3)] for dummy_row in range(3)]
+        for order in orders:
+            board_clone = order_board.clone()
+            player = provided.PLAYERX
+            for square in order:
+                if board_clone.check_win() != None:
+                    break
+                board_clone.move(square // 3, square % 3, player)
+                player = provided.switch_player(player)
+            mc_update_scores(order_scores, board_clone, provided.PLAYERX)
+        batch_scores = poc_ttt_numpy.scores_from_orders(order_board, provided.PLAYERX, np.array(orders))
+        suite.run_test(batch_scores.reshape(3, 3).tolist(), order_scores, \
+            "Test #13: scores_from_orders matches mc_update_scores, reverse=" + str(reverse))
+
+    visits = mcts_player.searched.visits
+    mcts_player.get_move(mcts_board, provided.PLAYERX, 100)
+    suite.run_test(mcts_player.reused_visits, visits, \
+        "Test #14: MCTS goes on with the tree of a position asked again")
+
+    self_play = poc_ttt_mcts.MCTSPlayer()
+    self_play_board = provided.TTTBoard(3)
+    row, col = self_play.get_move(self_play_board, provided.PLAYERX, 500)
+    self_play_board.move(row, col, provided.PLAYERX)
+    visits = self_play.root.visits
+    self_play.get_move(self_play_board, provided.PLAYERO, 100)
+    suite.run_test(self_play.reused_visits, visits, \
+        "Test #15: MCTS reuses its root when it plays both sides")
+
     suite.report_results()
 
 run_test()
@@ -0,0 +1,166 @@
+"""
+Headless Tic-Tac-Toe tournament, run over a process pool.
+
+A player is either a module level function with the mc_move signature (board, player, trials),
+such as mc_move, mc_move_fast or the minimax move_wrapper, or a class whose get_move method has
+that signature, such as MCTSPlayer. A new instance of a class is made for every game, so players
+that keep state between moves share nothing between games or between tournament entries.
+
+Every pair of players meets in both orders. Every game is seeded from (seed, X name, O name,
+game number), so the results do not depend on how many processes run them or in which order.
+"""
+
+import multiprocessing
+import random
+import time
+import types
+
+import poc_ttt_provided as provided
+
+LATENCY_PERCENTILES = [50, 90, 99]
+
+
+def game_seed(seed, name_x, name_o, game_number):
+    """
+    Seed for one game, independent of the worker that plays it.
+    """
+    return "%d-%s-%s-%d" % (seed, name_x, name_o, game_number)
+
+
+def new_move_function(player_spec):
+    """
+    The move function for one game: the function itself, or get_move of a new instance
+    when player_spec is a class.
+    """
+    if isinstance(player_spec, (type, types.ClassType)):
+        return player_spec().get_move
+    return player_spec
+
+
+def play_game(task):
+    """
+    Play one game in a worker process, without printing
+    :param task: tuple of (X name, X player, X trials, O name, O player, O trials,
+                 game number, seed, dim, reverse)
+    :return: dictionary with both names, the game number, the winner's name (None for a draw)
+             and the seconds each move took, by player name
+    """
+    name_x, player_x, trials_x, name_o, player_o, trials_o, game_number, seed, dim, reverse = task
+    random.seed(game_seed(seed, name_x, name_o, game_number))
+
+    board = provided.TTTBoard(dim, reverse)
+    players = {provided.PLAYERX: (name_x, new_move_function(player_x), trials_x),
+               provided.PLAYERO: (name_o, new_move_function(player_o), trials_o)}
+    move_times = {name_x: [], name_o: []}
+    player = provided.PLAYERX
+    while board.check_win() is None:
+        name, move_function, trials = players[player]
+        start = time.time()
+        row, col = move_function(board, player, trials)
+        move_times[name].append(time.time() - start)
+        board.move(row, col, player)
+        player = provided.switch_player(player)
+
+    winner = board.check_win()
+    if winner == provided.DRAW:
+        winner_name = None
+    else:
+        winner_name = players[winner][0]
+    return {"x": name_x,
+            "o": name_o,
+            "game": game_number,
+            "winner": winner_name,
+            "move_times": move_times}
+
+
+def iter_tournament(players, num_games, dim=3, reverse=False, seed=0, processes=None, pool=None):
+    """
+    Play num_games games for every ordered pair of players and generate each result as soon as it is done
+    :param players: dictionary of player name to (player function or class, trials)
+    :param num_games: number of games per ordered pair, so each pair plays 2 * num_games games
+    :param dim: board dimension
+    :param reverse: play in reverse mode
+    :param seed: base seed of the tournament
+    :param processes: number of worker processes of the pool made when none is given
+    :param pool: pool to reuse between tournaments, otherwise one is made for this one
+    :return: generator of play_game() results, in completion order
+    """
+    names = sorted(players)
+    tasks = [(name_x, players[name_x][0], players[name_x][1], name_o, players[name_o][0], players[name_o][1],
+              game_number, seed, dim, reverse)
+             for name_x in names for name_o in names if name_x != name_o
+             for game_number in range(num_games)]
+
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes)
+    try:
+        # a game is many playouts long, so sending games one at a time costs little
+        # and keeps the workers evenly loaded when some players are much slower
+        for result in pool.imap_unordered(play_game, tasks, 1):
+            yield result
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+
+
+def latency_percentile(sorted_times, pct):
+    """
+    Percentile of an already sorted list of move times, interpolating between the two
+    nearest moves.
+    """
+    position = pct / 100.0 * (len(sorted_times) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_times) - 1)
+    return sorted_times[lower] + (sorted_times[upper] - sorted_times[lower]) * (position - lower)
+
+
+def summarize(results):
+    """
+    Aggregate play_game() results
+    :param results: iterable of results
+    :return: dictionary of player name to its number of games, wins, draws, losses, win and draw rates,
+             and {percentile: seconds} of its move latency
+    """
+    counts = {}
+    latencies = {}
+    for result in results:
+        for name in [result["x"], result["o"]]:
+            player_counts = counts.setdefault(name, {"games": 0, "wins": 0, "draws": 0, "losses": 0})
+            player_counts["games"] += 1
+            if result["winner"] is None:
+                player_counts["draws"] += 1
+            elif result["winner"] == name:
+                player_counts["wins"] += 1
+            else:
+                player_counts["losses"] += 1
+            latencies.setdefault(name, []).extend(result["move_times"][name])
+
+    summary = {}
+    for name, player_counts in counts.items():
+        summary[name] = dict(player_counts)
+        summary[name]["win_rate"] = float(player_counts["wins"]) / player_counts["games"]
+        summary[name]["draw_rate"] = float(player_counts["draws"]) / player_counts["games"]
+        move_times = sorted(latencies[name])
+        if move_times:
+            summary[name]["latency"] = dict([(pct, latency_percentile(move_times, pct))
+                                             for pct in LATENCY_PERCENTILES])
+        else:
+            summary[name]["latency"] = {}
+    return summary
+
+
+def run_tournament(players, num_games, dim=3, reverse=False, seed=0, processes=None):
+    """
+    Play a whole tournament and return its summary.
+    """
+    return summarize(iter_tournament(players, num_games, dim, reverse, seed, processes))
+
+
+# import poc_ttt_template
+# import poc_ttt_mcts
+# print run_tournament({"mc": (poc_ttt_template.mc_move_fast, 1000),
+#                       "mcts": (poc_ttt_mcts.MCTSPlayer, 1000)}, 50)
+# print run_tournament({"mc": (poc_ttt_template.mc_move_fast, 1000),
+#                       "mcts": (poc_ttt_mcts.MCTSPlayer, 1000)}, 20, 4, True)